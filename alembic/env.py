@@ -17,6 +17,7 @@ sys.path.insert(
 from app.core.config import settings
 from app.core.db import Base
 import app.models.user  # импорт модели, чтобы Base.metadata увидела её
+import app.models.outbox
 
 # Alembic Config
 config = context.config
@@ -31,6 +32,13 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Не трогаем служебные таблицы FTS5 поиска пользователей (создаются DDL-событиями модели)
+    """
+    return not (type_ == "table" and name.startswith("users_fts"))
+
+
 def run_migrations_offline() -> None:
     """
     Запуск миграций в offline-режиме (генерация SQL)
@@ -39,6 +47,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         as_sql=True,
@@ -55,6 +64,7 @@ def do_run_migrations(connection: Connection) -> None:
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_object=include_object,
     )
     with context.begin_transaction():
         context.run_migrations()
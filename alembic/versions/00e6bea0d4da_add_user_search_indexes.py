@@ -0,0 +1,73 @@
+"""add user search indexes
+
+Revision ID: 00e6bea0d4da
+Revises: 23a4b1a5af9e
+Create Date: 2026-10-18 17:02:44.913260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00e6bea0d4da'
+down_revision: Union[str, Sequence[str], None] = '23a4b1a5af9e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # CONCURRENTLY не блокирует запись в users, но не работает внутри транзакции
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY ix_users_email_lower_pattern "
+                "ON users (lower(email) text_pattern_ops)"
+            )
+            op.execute(
+                "CREATE INDEX CONCURRENTLY ix_users_full_name_trgm ON users USING gin "
+                "((coalesce(first_name, '') || ' ' || coalesce(last_name, '')) gin_trgm_ops)"
+            )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE users_fts USING fts5("
+            "email, first_name, last_name, content='users', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN "
+            "INSERT INTO users_fts(rowid, email, first_name, last_name) "
+            "VALUES (new.id, new.email, new.first_name, new.last_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, email, first_name, last_name) "
+            "VALUES ('delete', old.id, old.email, old.first_name, old.last_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_au AFTER UPDATE OF email, first_name, last_name ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, email, first_name, last_name) "
+            "VALUES ('delete', old.id, old.email, old.first_name, old.last_name); "
+            "INSERT INTO users_fts(rowid, email, first_name, last_name) "
+            "VALUES (new.id, new.email, new.first_name, new.last_name); END"
+        )
+        # индексируем уже существующих пользователей
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_full_name_trgm")
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_lower_pattern")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS users_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS users_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS users_fts_ai")
+        op.execute("DROP TABLE IF EXISTS users_fts")
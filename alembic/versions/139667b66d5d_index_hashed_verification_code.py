@@ -0,0 +1,45 @@
+"""index hashed verification_code
+
+Revision ID: 139667b66d5d
+Revises: c25742e51a23
+Create Date: 2026-10-18 14:03:51.602217
+
+"""
+import hashlib
+import hmac
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '139667b66d5d'
+down_revision: Union[str, Sequence[str], None] = 'c25742e51a23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # старые коды хранились в открытом виде: заменяем их на HMAC, как в
+    # app.services.verification.hash_code, чтобы уже отправленные письма остались рабочими
+    bind = op.get_bind()
+    users = sa.table('users', sa.column('id'), sa.column('email'), sa.column('verification_code'))
+    rows = bind.execute(
+        sa.select(users.c.id, users.c.email, users.c.verification_code)
+        .where(users.c.verification_code.isnot(None))
+    ).all()
+    key = settings.SECRET_KEY.encode()
+    for user_id, email, code in rows:
+        code_hash = hmac.new(key, f"{email}:{code}".encode(), hashlib.sha256).hexdigest()
+        bind.execute(users.update().where(users.c.id == user_id).values(verification_code=code_hash))
+    op.create_index(op.f('ix_users_verification_code'), 'users', ['verification_code'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # хеши кодов обратно в открытый вид не превращаются
+    op.drop_index(op.f('ix_users_verification_code'), table_name='users')
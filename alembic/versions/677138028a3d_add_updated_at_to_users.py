@@ -0,0 +1,32 @@
+"""add updated_at to users
+
+Revision ID: 677138028a3d
+Revises: 00e6bea0d4da
+Create Date: 2026-10-18 18:11:26.730512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '677138028a3d'
+down_revision: Union[str, Sequence[str], None] = '00e6bea0d4da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite не умеет ADD COLUMN с неконстантным DEFAULT, а пересоздание таблицы
+    # удалило бы триггеры поиска; значение всё равно заполняет приложение
+    server_default = None if op.get_bind().dialect.name == 'sqlite' else sa.text('now()')
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=server_default, nullable=True))
+    op.execute("UPDATE users SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'updated_at')
@@ -0,0 +1,28 @@
+"""add unverified cleanup index to users
+
+Revision ID: c25742e51a23
+Revises: 9bca76555dc3
+Create Date: 2026-10-18 10:12:04.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c25742e51a23'
+down_revision: Union[str, Sequence[str], None] = '9bca76555dc3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_is_verified_created_at', 'users', ['is_verified', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_is_verified_created_at', table_name='users')
@@ -18,6 +18,12 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.worker.delete_unverified_users_task",
         "schedule": 24 * 3600,  # в секундах
     },
+    # публикация задач из outbox; просроченные запуски не копятся в очереди
+    "relay-outbox": {
+        "task": "app.tasks.worker.relay_outbox_task",
+        "schedule": settings.OUTBOX_RELAY_INTERVAL_SECONDS,
+        "options": {"expires": settings.OUTBOX_RELAY_INTERVAL_SECONDS},
+    },
 }
 
 celery_app.conf.timezone = "UTC"
\ No newline at end of file
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,19 +12,117 @@ class Settings(BaseSettings):
 
 
     DATABASE_URL: str = "sqlite+aiosqlite:///./db.sqlite3"
+    # Пул соединений и логирование SQL
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False
+    # Реплики для чтения через запятую (пусто — всё читается из основной БД);
+    # сколько секунд не использовать реплику после ошибки соединения
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: int = 30
+    # Режим SQLite для конкурентной нагрузки: WAL, одно соединение-писатель
+    # и пул соединений только для чтения (размер — DB_POOL_SIZE)
+    SQLITE_HIGH_CONCURRENCY: bool = False
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
+    # Логировать запросы дольше порога (0 — выключено) с заданной долей выборки
+    DB_SLOW_QUERY_MS: int = 0
+    DB_SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    # Профилирование запросов к БД: для всех запросов или по заголовку X-Profile-Queries: 1
+    QUERY_PROFILING_ENABLED: bool = False
+    QUERY_PROFILING_HEADER_ENABLED: bool = False
+    QUERY_PROFILING_HISTORY: int = 50
+    # Сколько одинаковых запросов за HTTP-запрос считать подозрением на N+1
+    QUERY_PROFILING_REPEAT_THRESHOLD: int = 5
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 1440
+    # Библиотека для проверки JWT: "jose" или "pyjwt" (быстрее, ставится отдельно)
+    JWT_BACKEND: str = "jose"
+    # Кеш уже проверенных токенов
+    TOKEN_CACHE_MAXSIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
 
     REDIS_URL: str
     SMTP_HOST: str
     SMTP_PORT: int
     SMTP_USER: str
     SMTP_PASS: str
+    # Метрики Prometheus (/metrics); порт HTTP-сервера метрик Celery-воркера (0 — выключен)
+    METRICS_ENABLED: bool = True
+    METRICS_WORKER_PORT: int = 0
+
+    # Пул SMTP-соединений в процессе воркера
+    SMTP_POOL_SIZE: int = 4
+    SMTP_POOL_MAX_IDLE_SECONDS: int = 240
+    SMTP_POOL_HEALTHCHECK_SECONDS: int = 30
+
+    # Пакетная отправка писем верификации: до N писем или раз в T мс
+    VERIFICATION_EMAIL_BATCHING: bool = False
+    VERIFICATION_EMAIL_BATCH_SIZE: int = 100
+    VERIFICATION_EMAIL_BATCH_WINDOW_MS: int = 500
+    VERIFICATION_EMAIL_RETRY_DELAY_SECONDS: int = 30
+
+    # Ретрансляция outbox в брокер (задача Celery beat): период и размер пачки
+    OUTBOX_RELAY_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RELAY_BATCH_SIZE: int = 500
+
+    # Пул процессов для bcrypt (0 — по числу CPU)
+    PASSWORD_HASH_WORKERS: int = 0
+    # Максимум задач хеширования в очереди, сверх него отвечаем 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Стоимость bcrypt: фиксированное число раундов (0 — не задано), целевое время
+    # одного хеша для калибровки при старте (0 — без калибровки) и её нижняя граница
+    PASSWORD_HASH_ROUNDS: int = 0
+    PASSWORD_HASH_TARGET_MS: int = 0
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+
+    # Длина числового кода верификации и число неверных попыток, после которого код сгорает
+    VERIFICATION_CODE_DIGITS: int = 6
+    VERIFICATION_MAX_ATTEMPTS: int = 5
+
+    # Сколько неподтверждённых пользователей удалять за один DELETE
+    UNVERIFIED_CLEANUP_BATCH_SIZE: int = 1000
+    # Сколько строк вставлять за один INSERT при массовом импорте
+    USER_IMPORT_CHUNK_SIZE: int = 500
+
+    # Кеш пользователей для get_current_user: память процесса + Redis
+    USER_CACHE_MAXSIZE: int = 10000
+    USER_CACHE_LOCAL_TTL_SECONDS: int = 5
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_REDIS_ENABLED: bool = True
+    # Сколько секунд после изменения пользователь читается для кеша с основной БД,
+    # а не с реплики (запас на отставание реплик; 0 — не учитывать)
+    USER_CACHE_REPLICA_LAG_SECONDS: int = 10
+
+    # Ограничение частоты запросов к /auth/login, /auth/signup и /auth/verify
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_PER_IP: int = 30
+    RATE_LIMIT_PER_EMAIL: int = 5
 
     class Config:
         env_file = ".env"
 
 
-settings = Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Settings читаются из окружения при первом обращении, а не при импорте.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+
+settings = _LazySettings()
\ No newline at end of file
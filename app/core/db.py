@@ -1,24 +1,242 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base  # ← добавили declarative_base
 from app.core.config import settings
+from app.core.metrics import TimedQueuePool, count_query
+from app.core.profiling import install_query_profiler, profiling_available
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.db.slow_query")
+
+
+def _log_slow_queries(engine: AsyncEngine) -> None:
+    """
+    Логирует запросы дольше DB_SLOW_QUERY_MS вместо эха всех запросов подряд.
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_started_at) * 1000
+        if elapsed_ms < settings.DB_SLOW_QUERY_MS:
+            return
+        if random.random() < settings.DB_SLOW_QUERY_SAMPLE_RATE:
+            slow_query_logger.warning("Slow query (%.1f ms): %s", elapsed_ms, statement)
+
+
+def _count_queries(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        count_query()
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def sqlite_high_concurrency(url: Optional[str] = None) -> bool:
+    """
+    Включён ли режим SQLITE_HIGH_CONCURRENCY для файловой базы SQLite.
+    """
+    url = make_url(url or settings.DATABASE_URL)
+    return (
+        settings.SQLITE_HIGH_CONCURRENCY
+        and url.get_backend_name() == "sqlite"
+        and not _is_sqlite_memory(url)
+    )
+
+
+def sqlite_read_only_url(url: str) -> str:
+    """
+    URL того же файла SQLite, открываемого только для чтения.
+    """
+    url = make_url(url)
+    url = url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+    return url.render_as_string(hide_password=False)
+
+
+def _apply_sqlite_pragmas(engine: AsyncEngine, read_only: bool) -> None:
+    """
+    Настраивает каждое новое соединение SQLite. WAL позволяет читателям
+    не блокировать писателя; режим журнала хранится в файле, поэтому его
+    меняет только соединение-писатель.
+    """
+    @event.listens_for(engine.sync_engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.close()
+
+
+def make_engine(url: Optional[str] = None) -> AsyncEngine:
+    """
+    Создаёт асинхронный движок с настройками приложения (по умолчанию — для DATABASE_URL).
+    """
+    url = make_url(url or settings.DATABASE_URL)
+    options = dict(
+        echo=settings.DB_ECHO,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    high_concurrency = sqlite_high_concurrency(url)
+    read_only = url.query.get("mode") == "ro"
+    # SQLite в памяти работает на StaticPool, у которого нет размера пула
+    if not _is_sqlite_memory(url):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+        if high_concurrency and not read_only:
+            # все записи идут через одно соединение по очереди, без «database is locked»
+            options.update(pool_size=1, max_overflow=0)
+        if settings.METRICS_ENABLED:
+            options["poolclass"] = TimedQueuePool
+    engine = create_async_engine(url, **options)
+    if high_concurrency:
+        _apply_sqlite_pragmas(engine, read_only)
+    if settings.DB_SLOW_QUERY_MS > 0:
+        _log_slow_queries(engine)
+    if settings.METRICS_ENABLED:
+        _count_queries(engine)
+    if profiling_available():
+        install_query_profiler(engine)
+    return engine
+
+
+def make_sessionmaker(bind: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
 
-# Асинхронный движок
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-)
+# Движок и фабрика сессий веб-процесса создаются при первом обращении
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[sessionmaker] = None
+
+
+def get_engine() -> AsyncEngine:
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = make_engine()
+        _sessionmaker = make_sessionmaker(_engine)
+    return _engine
+
+
+def get_sessionmaker() -> sessionmaker:
+    get_engine()
+    return _sessionmaker
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения: выбираются по кругу, реплика с ошибкой соединения
+    пропускается DB_REPLICA_RETRY_SECONDS секунд.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.engines = [make_engine(url) for url in urls]
+        self._sessionmakers = [make_sessionmaker(engine) for engine in self.engines]
+        self._down_until = [0.0] * len(urls)
+        self._next = 0
+        for i, engine in enumerate(self.engines):
+            self._watch_errors(i, engine)
+
+    def _watch_errors(self, i: int, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _handle_error(context):
+            # ошибка подключения или разрыв соединения, а не ошибка самого запроса
+            if context.connection is None or context.is_disconnect:
+                self._down_until[i] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+                logger.warning("Read replica %d is unavailable: %s", i, context.original_exception)
+
+    def _candidates(self) -> List[int]:
+        count = len(self.engines)
+        start, self._next = self._next, (self._next + 1) % count
+        now = time.monotonic()
+        order = [(start + i) % count for i in range(count)]
+        return [i for i in order if self._down_until[i] <= now]
+
+    def session(self) -> Optional[AsyncSession]:
+        """
+        Сессия на первой доступной реплике или None, если доступных нет.
+        Соединение берётся только при первом запросе, поэтому ответ из кеша
+        не занимает пул реплики.
+        """
+        candidates = self._candidates()
+        if not candidates:
+            return None
+        session = self._sessionmakers[candidates[0]]()
+        session.info["replica"] = True
+        return session
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+_replicas: Optional[ReplicaSet] = None
+
+
+def get_replicas() -> Optional[ReplicaSet]:
+    global _replicas
+    if _replicas is None:
+        urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+        if not urls and sqlite_high_concurrency():
+            # читатели SQLite — пул соединений только для чтения к тому же файлу
+            urls = [sqlite_read_only_url(settings.DATABASE_URL)]
+        if not urls:
+            return None
+        _replicas = ReplicaSet(urls)
+    return _replicas
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия только для чтения: на реплике, а если их нет или все недоступны — на основной БД.
+    """
+    replicas = get_replicas()
+    session = replicas.session() if replicas else None
+    if session is None:
+        session = get_sessionmaker()()
+    async with session:
+        yield session
+
+
+async def dispose_engine() -> None:
+    global _engine, _sessionmaker, _replicas
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = _sessionmaker = None
+    if _replicas is not None:
+        await _replicas.dispose()
+        _replicas = None
 
-# Фабрика сессий
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
 
 # Базовый класс для моделей
 Base = declarative_base()
 
 # Зависимость для FastAPI
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    async with get_sessionmaker()() as session:
+        yield session
+
+# Зависимость для запросов только на чтение (реплики, если настроены)
+async def get_read_db():
+    async with read_session() as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,166 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from redis.exceptions import RedisError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.redis import get_sync_redis
+
+# При нескольких процессах (uvicorn --workers, Celery prefork) метрики
+# собираются через каталог PROMETHEUS_MULTIPROC_DIR
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed")
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the DB pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify time including wait for the hashing pool",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5, 10),
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+# Счётчик запросов к БД в рамках текущего HTTP-запроса
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+def count_query() -> None:
+    DB_QUERIES.inc()
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий ожидание свободного соединения.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+class CeleryQueueCollector:
+    """
+    Длина очередей в брокере, читается в момент сбора метрик.
+    """
+
+    queues = ("celery", "verification_emails:pending")
+
+    def _family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily("celery_queue_depth", "Messages waiting in broker queues", labels=["queue"])
+
+    def describe(self):
+        # без describe() реестр вызвал бы collect() (и Redis) прямо при регистрации
+        yield self._family()
+
+    def collect(self):
+        gauge = self._family()
+        try:
+            client = get_sync_redis()
+            for queue in self.queues:
+                gauge.add_metric([queue], client.llen(queue))
+        except RedisError:
+            return
+        yield gauge
+
+
+if not MULTIPROCESS:
+    REGISTRY.register(CeleryQueueCollector())
+
+
+def get_registry() -> CollectorRegistry:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CeleryQueueCollector())
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> bytes:
+    return generate_latest(get_registry())
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: время ответа по шаблону маршрута, запросы в работе
+    и число SQL-запросов на HTTP-запрос.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        REQUESTS_IN_FLIGHT.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.labels(method).dec()
+            _request_queries.reset(token)
+            # шаблон пути, а не сам путь — чтобы не плодить метки
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_DURATION.labels(method, route_path, str(status_code)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route_path).observe(queries[0])
+
@@ -0,0 +1,143 @@
+import itertools
+import logging
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-queries"
+
+
+class QueryProfile:
+    """
+    Все SQL-запросы одного HTTP-запроса: текст, время и число строк.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.queries: List[dict] = []
+
+    def add(self, statement: str, duration_ms: float, rowcount: int) -> None:
+        self.queries.append({
+            "statement": statement,
+            "duration_ms": round(duration_ms, 3),
+            "rowcount": rowcount,
+        })
+
+    def repeated(self) -> dict:
+        """
+        Одинаковые запросы, выполненные больше одного раза (признак N+1).
+        """
+        counts = Counter(query["statement"] for query in self.queries)
+        return {statement: count for statement, count in counts.items() if count > 1}
+
+    def summary(self) -> dict:
+        slow_ms = settings.DB_SLOW_QUERY_MS
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "count": len(self.queries),
+            "total_ms": round(sum(query["duration_ms"] for query in self.queries), 3),
+            "repeated": self.repeated(),
+            "slow": [query for query in self.queries if slow_ms and query["duration_ms"] >= slow_ms],
+            "queries": self.queries,
+        }
+
+    def header(self) -> str:
+        repeated = self.repeated()
+        total_ms = sum(query["duration_ms"] for query in self.queries)
+        return (
+            f"id={self.id}; count={len(self.queries)}; total_ms={total_ms:.1f}; "
+            f"repeated={sum(repeated.values()) - len(repeated)}"
+        )
+
+
+_current: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+# Последние профили для отладочного эндпоинта
+_recent: Optional["deque[QueryProfile]"] = None
+
+
+def recent_profiles() -> "deque[QueryProfile]":
+    global _recent
+    if _recent is None:
+        _recent = deque(maxlen=settings.QUERY_PROFILING_HISTORY)
+    return _recent
+
+
+def profiling_available() -> bool:
+    return settings.QUERY_PROFILING_ENABLED or settings.QUERY_PROFILING_HEADER_ENABLED
+
+
+def install_query_profiler(engine: AsyncEngine) -> None:
+    """
+    Подписывается на события движка; запросы пишутся только в активный профиль.
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context._profile_started_at = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        started = getattr(context, "_profile_started_at", None)
+        if profile is not None and started is not None:
+            profile.add(statement, (time.perf_counter() - started) * 1000, cursor.rowcount)
+
+
+class QueryProfilingMiddleware:
+    """
+    Профилирует запросы к БД при QUERY_PROFILING_ENABLED или по заголовку
+    X-Profile-Queries: 1 (если разрешён QUERY_PROFILING_HEADER_ENABLED).
+    Краткая сводка уходит в заголовок X-Query-Profile, полная — в /debug/queries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if settings.QUERY_PROFILING_ENABLED:
+            return True
+        if settings.QUERY_PROFILING_HEADER_ENABLED:
+            return (PROFILE_HEADER.encode(), b"1") in scope.get("headers", [])
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(scope["method"], scope["path"])
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-profile", profile.header().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current.reset(token)
+            recent_profiles().append(profile)
+            for statement, count in profile.repeated().items():
+                if count >= settings.QUERY_PROFILING_REPEAT_THRESHOLD:
+                    logger.warning(
+                        "Possible N+1: statement executed %d times in %s %s: %s",
+                        count, profile.method, profile.path, statement,
+                    )
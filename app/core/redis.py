@@ -0,0 +1,36 @@
+from typing import Optional
+
+import redis
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+_client: Optional[Redis] = None
+_sync_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> Redis:
+    """
+    Общий асинхронный клиент Redis (создаётся при первом обращении).
+    """
+    global _client
+    if _client is None:
+        _client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def get_sync_redis() -> redis.Redis:
+    """
+    Синхронный клиент Redis для Celery-задач и кода вне event loop.
+    """
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _sync_client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, func
+from app.core.db import Base
+
+class OutboxMessage(Base):
+    """
+    Задача, которую нужно опубликовать в брокер. Пишется в одной транзакции
+    с изменением данных и удаляется ретранслятором после публикации.
+    """
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True)
+    task = Column(String, nullable=False)
+    args = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
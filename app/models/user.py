@@ -1,8 +1,12 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, func, Enum
+    Column, Integer, String, Boolean, DateTime, func, Enum, Index, DDL, event
 )
 from app.core.db import Base
 import enum
+from datetime import datetime, timezone
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
 
 class RoleEnum(str, enum.Enum):
     user = "user"
@@ -10,6 +14,10 @@ class RoleEnum(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # для ежедневной очистки неподтверждённых пользователей
+        Index("ix_users_is_verified_created_at", "is_verified", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -19,7 +27,44 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     role = Column(Enum(RoleEnum), default=RoleEnum.user, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Время последнего изменения с микросекундами — из него строится ETag.
+    # Заполняется на стороне приложения, поэтому меняется и при Core UPDATE.
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow, server_default=func.now())
 
     # Поля для верификации
-    verification_code = Column(String, nullable=True)
+    # HMAC кода, сам код не хранится
+    verification_code = Column(String, nullable=True, index=True)
     verification_expiry = Column(DateTime(timezone=True), nullable=True)
+
+
+# Индексы для GET /users/search (в миграции 00e6bea0d4da — те же DDL).
+# PostgreSQL: префикс email по text_pattern_ops, имя и фамилия — триграммы;
+# SQLite: внешнее FTS5-содержимое таблицы users, синхронизируемое триггерами.
+USER_SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX ix_users_email_lower_pattern ON users (lower(email) text_pattern_ops)",
+        "CREATE INDEX ix_users_full_name_trgm ON users USING gin "
+        "((coalesce(first_name, '') || ' ' || coalesce(last_name, '')) gin_trgm_ops)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE users_fts USING fts5("
+        "email, first_name, last_name, content='users', content_rowid='id')",
+        "CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts(rowid, email, first_name, last_name) "
+        "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+        "CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, email, first_name, last_name) "
+        "VALUES ('delete', old.id, old.email, old.first_name, old.last_name); END",
+        "CREATE TRIGGER users_fts_au AFTER UPDATE OF email, first_name, last_name ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, email, first_name, last_name) "
+        "VALUES ('delete', old.id, old.email, old.first_name, old.last_name); "
+        "INSERT INTO users_fts(rowid, email, first_name, last_name) "
+        "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+    ],
+}
+
+for _dialect, _statements in USER_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(User.__table__, "before_drop", DDL("DROP TABLE IF EXISTS users_fts").execute_if(dialect="sqlite"))
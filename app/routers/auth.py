@@ -1,79 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from datetime import datetime
 
-from app.models.user import User
 from app.schemas.user import UserCreate, VerifyRequest
-from app.schemas.token import Token
-from app.services.user import create_user, get_user_by_email
-from app.services.auth import (
-    verify_password,
-    create_access_token,
-    create_refresh_token,
-    decode_token,
-)
-from app.core.db import get_db
-from app.tasks.worker import send_verification_email_task
+from app.schemas.token import RefreshRequest, Token
+from app.services.user import create_user, get_user_by_email, rehash_password
+from app.services.hashing import needs_rehash, verify_password_async
+from app.services.rate_limit import rate_limit_login, rate_limit_signup, rate_limit_verify
+from app.services.tokens import issue_tokens, revoke_refresh_token, rotate_refresh_token
+from app.services.verification import verify_code
+from app.core.db import get_db, get_read_db, get_sessionmaker
 
 router = APIRouter(tags=["auth"])
 
 
-@router.post("/signup", response_model=Token, summary="Register new user")
+@router.post(
+    "/signup",
+    response_model=Token,
+    summary="Register new user",
+    dependencies=[Depends(rate_limit_signup)],
+)
 async def signup(data: UserCreate, db: AsyncSession = Depends(get_db)):
-    # создаём пользователя и код верификации в сервисе
-    user = await create_user(data, db)
-    # запускаем фоновую отправку письма
-    send_verification_email_task.delay(user.email, user.verification_code)
-    return {
-        "access_token": create_access_token(user.id),
-        "refresh_token": create_refresh_token(user.id),
-        "token_type": "bearer",
-    }
+    # создаём пользователя; письмо с кодом уйдёт в брокер через outbox
+    user, _ = await create_user(data, db)
+    return await issue_tokens(user.id)
 
 
-@router.post("/login", response_model=Token, summary="Authenticate and get tokens")
+@router.post(
+    "/login",
+    response_model=Token,
+    summary="Authenticate and get tokens",
+    dependencies=[Depends(rate_limit_login)],
+)
 async def login(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    user = await get_user_by_email(form_data.username, db)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        user = await get_user_by_email(form_data.username, db)
+    except DBAPIError:
+        if not db.info.get("replica"):
+            raise
+        user = None
+    if user is None and db.info.get("replica"):
+        # реплика недоступна или ещё не получила только что зарегистрированного пользователя
+        async with get_sessionmaker()() as primary:
+            user = await get_user_by_email(form_data.username, primary)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {
-        "access_token": create_access_token(user.id),
-        "refresh_token": create_refresh_token(user.id),
-        "token_type": "bearer",
-    }
+    # хеш с устаревшей стоимостью обновляем после ответа, не задерживая вход
+    if needs_rehash(user.hashed_password):
+        background_tasks.add_task(rehash_password, user.id, user.hashed_password, form_data.password)
+    return await issue_tokens(user.id)
+
+
+@router.post("/refresh", response_model=Token, summary="Rotate refresh token and get new tokens")
+async def refresh(data: RefreshRequest):
+    return await rotate_refresh_token(data.refresh_token)
 
 
-@router.post("/refresh", response_model=Token, summary="Refresh access token")
-async def refresh(token: str):
-    data = decode_token(token)
-    return {
-        "access_token": create_access_token(data.user_id),
-        "refresh_token": create_refresh_token(data.user_id),
-        "token_type": "bearer",
-    }
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, summary="Revoke refresh token")
+async def logout(data: RefreshRequest):
+    await revoke_refresh_token(data.refresh_token)
+    return None
 
 
-@router.post("/verify", summary="Verify user by code")
+@router.post("/verify", summary="Verify user by code", dependencies=[Depends(rate_limit_verify)])
 async def verify(data: VerifyRequest, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).filter_by(email=data.email))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    # проверяем код и срок действия
-    if user.verification_code != data.code or user.verification_expiry < datetime.utcnow():
+    # код, email и срок действия проверяются одним условным UPDATE
+    user_id = await verify_code(data.email, data.code, db)
+    if user_id is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired code")
-    user.is_verified = True
-    user.verification_code = None
-    user.verification_expiry = None
-    db.add(user)
-    await db.commit()
     return {"detail": "User verified"}
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.core.profiling import recent_profiles
+from app.routers.users import admin_only
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+)
+
+
+@router.get("/queries", summary="Recent query profiles (admin only)")
+async def read_query_profiles(_=Depends(admin_only)):
+    return [
+        {key: value for key, value in profile.summary().items() if key != "queries"}
+        for profile in reversed(recent_profiles())
+    ]
+
+
+@router.get("/queries/{profile_id}", summary="Query profile with all statements (admin only)")
+async def read_query_profile(profile_id: int, _=Depends(admin_only)):
+    for profile in recent_profiles():
+        if profile.id == profile_id:
+            return profile.summary()
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.core.metrics import CONTENT_TYPE_LATEST, render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # синхронный обработчик: сбор метрик читает Redis и не должен блокировать loop
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
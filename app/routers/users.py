@@ -1,15 +1,32 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from app.models.user import User
-from app.schemas.user import UserRead, UserUpdate
-from app.services.user import get_user, get_users, update_user, delete_user
+from app.models.user import RoleEnum, User
+from app.schemas.user import (
+    UserBulkUpdate,
+    UserBulkUpdateResult,
+    UserImportResult,
+    UserRead,
+    UserUpdate,
+)
+from app.services.bulk import bulk_update_users, import_users, iter_lines, parse_rows
+from app.services.user import (
+    delete_user,
+    get_current_user_cached,
+    get_user_cached,
+    get_users,
+    search_users,
+    stream_users,
+    update_user,
+    user_etag,
+)
 from app.services.auth import decode_token
-from app.core.db import get_db
+from app.core.db import get_db, get_read_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -19,14 +36,33 @@ router = APIRouter(
 )
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     data = decode_token(token)
-    user = await get_user(data.user_id, db)
+    # refresh-токен нельзя использовать вместо access-токена
+    if data.typ == "refresh":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    # своя короткая сессия только при промахе кеша: не держим соединение на весь запрос
+    user = await get_current_user_cached(data.user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     return user
 
 
+def _user_response(request: Request, user: User) -> Response:
+    """
+    UserRead с ETag; если клиент прислал тот же ETag в If-None-Match — 304 без тела.
+    """
+    etag = user_etag(user)
+    if etag is None:
+        return ORJSONResponse(UserRead.model_validate(user).model_dump(mode="json"))
+    if_none_match = request.headers.get("if-none-match", "")
+    # для If-None-Match используется слабое сравнение: префикс W/ не учитывается
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return ORJSONResponse(UserRead.model_validate(user).model_dump(mode="json"), headers={"ETag": etag})
+
+
 def admin_only(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
@@ -34,30 +70,91 @@ def admin_only(current_user: User = Depends(get_current_user)) -> User:
 
 
 @router.get("/me", response_model=UserRead, summary="Get current authenticated user")
-async def read_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def read_me(request: Request, current_user: User = Depends(get_current_user)):
+    # пользователь обычно уже в кеше, так что 304 отдаётся без запроса к БД
+    return _user_response(request, current_user)
 
 
-@router.get("/", response_model=List[UserRead], summary="List all users (admin only)")
+@router.get("/", response_model=List[UserRead], summary="List users page by page (admin only)")
 async def read_users(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[int] = Query(None, description="Return users with id greater than this cursor"),
+    role: Optional[RoleEnum] = None,
+    is_verified: Optional[bool] = None,
+    stream: bool = Query(False, description="Stream all matching users as NDJSON"),
+    db: AsyncSession = Depends(get_read_db),
+    _=Depends(admin_only),
+):
+    # строки уже содержат ровно поля UserRead, поэтому отдаём их напрямую
+    # через orjson, минуя повторную валидацию response_model
+    if stream:
+        async def ndjson():
+            async for user in stream_users(role=role, is_verified=is_verified):
+                yield orjson.dumps(user) + b"\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    users = await get_users(db, limit=limit, after=after, role=role, is_verified=is_verified)
+    headers = {}
+    # курсор следующей страницы — id последнего пользователя
+    if len(users) == limit:
+        headers["X-Next-After"] = str(users[-1]["id"])
+    return ORJSONResponse(users, headers=headers)
+
+
+@router.get("/search", response_model=List[UserRead], summary="Search users by email prefix or name (admin only)")
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="Email prefix or part of the name"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    _=Depends(admin_only),
+):
+    return ORJSONResponse(await search_users(db, q, limit))
+
+
+@router.post(
+    "/bulk",
+    response_model=UserImportResult,
+    summary="Import users from NDJSON or CSV (admin only)",
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+            "required": True,
+        }
+    },
+)
+async def import_users_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(admin_only),
+):
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    rows = parse_rows(iter_lines(request.stream()), is_csv=is_csv)
+    return await import_users(rows, db)
+
+
+@router.patch("/bulk", response_model=UserBulkUpdateResult, summary="Update many users at once (admin only)")
+async def patch_users_bulk(
+    data: UserBulkUpdate,
     db: AsyncSession = Depends(get_db),
     _=Depends(admin_only),
 ):
-    result = await db.execute(select(User))
-    users = result.scalars().all()
-    return users
+    updated = await bulk_update_users(data.ids, data.changes, db)
+    return {"updated": updated}
 
 
 @router.get("/{user_id}", response_model=UserRead, summary="Get user by ID (admin only)")
 async def read_user(
+    request: Request,
     user_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _=Depends(admin_only),
 ):
-    user = await get_user(user_id, db)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return user
+    user = await get_user_cached(user_id, db)
+    return _user_response(request, user)
 
 
 @router.patch("/{user_id}", response_model=UserRead, summary="Update user (admin only)")
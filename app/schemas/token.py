@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class Token(BaseModel):
@@ -6,4 +8,9 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 class TokenData(BaseModel):
-    user_id: int
\ No newline at end of file
+    user_id: int
+    typ: Optional[str] = None
+    jti: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
\ No newline at end of file
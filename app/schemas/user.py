@@ -1,14 +1,16 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import List, Optional
 from app.models.user import RoleEnum
 
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
-    first_name: Optional[str]
-    last_name: Optional[str]
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
 
 class UserRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     email: EmailStr
     first_name: Optional[str]
@@ -16,13 +18,33 @@ class UserRead(BaseModel):
     is_verified: bool
     role: RoleEnum
 
-    class Config:
-        orm_mode = True
-
 class UserUpdate(BaseModel):
-    first_name: Optional[str]
-    last_name: Optional[str]
-    role: Optional[RoleEnum]
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    role: Optional[RoleEnum] = None
+
+class UserImport(BaseModel):
+    email: EmailStr
+    password: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    role: RoleEnum = RoleEnum.user
+    # импортированные аккаунты уже подтверждены, иначе их удалит ночная очистка
+    is_verified: bool = True
+
+class UserImportResult(BaseModel):
+    inserted: int
+    skipped: int
+    invalid_lines: List[int]
+    # строки, не импортированные из-за перегрузки сервера, — их можно отправить повторно
+    failed_lines: List[int] = []
+
+class UserBulkUpdate(BaseModel):
+    ids: List[int] = Field(min_length=1)
+    changes: UserUpdate
+
+class UserBulkUpdateResult(BaseModel):
+    updated: int
 
 class VerifyRequest(BaseModel):
     email: EmailStr
@@ -1,29 +1,91 @@
+import hashlib
+import time
+from functools import lru_cache
+from typing import Optional
+
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import jwt
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.schemas.token import TokenData
 
+try:
+    import jwt as pyjwt
+except ImportError:  # PyJWT — необязательная зависимость
+    pyjwt = None
+
+_JWT_ERRORS = (JWTError,) + ((pyjwt.PyJWTError,) if pyjwt else ())
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+@lru_cache(maxsize=None)
+def _context(rounds: Optional[int] = None, exact: bool = False) -> CryptContext:
+    """
+    Контекст с заданным числом раундов bcrypt. Хеши с меньшим числом раундов
+    считаются устаревшими, при exact — и с большим тоже.
+    """
+    if rounds is None:
+        return pwd_context
+    options = {"bcrypt__default_rounds": rounds, "bcrypt__min_rounds": rounds}
+    if exact:
+        options["bcrypt__max_rounds"] = rounds
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", **options)
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    return _context(rounds).hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+def password_needs_rehash(hashed: str, rounds: Optional[int] = None, exact: bool = False) -> bool:
+    return _context(rounds, exact).needs_update(hashed)
+
 def create_access_token(user_id: int) -> str:
-    to_encode = {"sub": str(user_id)}
+    to_encode = {"sub": str(user_id), "typ": "access"}
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def create_refresh_token(user_id: int) -> str:
-    to_encode = {"sub": str(user_id)}
+def create_refresh_token(user_id: int, jti: str) -> str:
+    to_encode = {"sub": str(user_id), "typ": "refresh", "jti": jti}
     expire = datetime.utcnow() + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+# Уже проверенные токены: ключ — sha256 токена, запись живёт не дольше exp
+_token_cache: Optional[TTLCache] = None
+
+def _tokens() -> TTLCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+    return _token_cache
+
+def _decode_jwt(token: str) -> dict:
+    if settings.JWT_BACKEND == "pyjwt":
+        if pyjwt is None:
+            raise RuntimeError("JWT_BACKEND=pyjwt requires the PyJWT package")
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
 def decode_token(token: str) -> TokenData:
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    return TokenData(user_id=int(payload.get("sub")))
\ No newline at end of file
+    key = hashlib.sha256(token.encode()).digest()
+    data = _tokens().get(key)
+    if data is not None:
+        return data
+
+    try:
+        payload = _decode_jwt(token)
+    except _JWT_ERRORS:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    data = TokenData(user_id=int(payload.get("sub")), typ=payload.get("typ"), jti=payload.get("jti"))
+    ttl = min(payload["exp"] - time.time(), settings.TOKEN_CACHE_TTL_SECONDS)
+    if ttl > 0:
+        _tokens().set(key, data, ttl=ttl)
+    return data
\ No newline at end of file
@@ -0,0 +1,201 @@
+import codecs
+import csv
+import json
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.user import UserImport, UserUpdate
+from app.services.hashing import hash_passwords_async
+from app.services.user_cache import invalidate_users
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Разбивает поток байтов тела запроса на строки, не читая его целиком.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+class _LineFeed:
+    """
+    Источник строк для одного csv.reader на весь поток: строки подкладываются
+    по мере чтения тела запроса, а запись читается, когда она уже целиком здесь.
+    """
+
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def parse_rows(lines: AsyncIterator[str], is_csv: bool) -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    """
+    Превращает строки NDJSON или CSV (с заголовком) в словари.
+    Для нечитаемой строки вместо словаря отдаёт None.
+    """
+    header = None
+    line_no = 0
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    # номер первой строки текущей CSV-записи и число кавычек в ней:
+    # поле в кавычках может содержать перевод строки
+    record_start = quotes = 0
+    async for line in lines:
+        line_no += 1
+        if is_csv:
+            if not feed.lines and not line.strip():
+                continue
+            if not feed.lines:
+                record_start, quotes = line_no, 0
+            feed.lines.append(line + "\n")
+            quotes += line.count('"')
+            # запись закончена, когда кавычки сбалансированы ("" внутри поля — пара)
+            if quotes % 2:
+                continue
+            values = next(reader)
+            if header is None:
+                header = values
+                continue
+            # пустые ячейки опускаем, чтобы сработали значения по умолчанию UserImport
+            yield record_start, {key: value for key, value in zip(header, values) if value != ""}
+        else:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_no, row if isinstance(row, dict) else None
+    if feed.lines:
+        # незакрытая кавычка в последней записи
+        yield record_start, None
+
+
+async def _insert_rows(rows: List[dict], db: AsyncSession) -> int:
+    """
+    Вставляет строки, молча пропуская уже существующие email. Возвращает число вставленных.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(User).values(rows).on_conflict_do_nothing(index_elements=["email"])
+        return (await db.execute(stmt)).rowcount
+    # у остальных СУБД нет общего ON CONFLICT: существующие email отсеиваем заранее
+    emails = [row["email"] for row in rows]
+    seen = set(await db.scalars(select(User.email).where(User.email.in_(emails))))
+    new_rows = []
+    for row in rows:
+        if row["email"] not in seen:
+            seen.add(row["email"])
+            new_rows.append(row)
+    if new_rows:
+        await db.execute(insert(User), new_rows)
+    return len(new_rows)
+
+
+async def _insert_chunk(items: List[UserImport], db: AsyncSession) -> int:
+    hashed = await hash_passwords_async([item.password for item in items])
+    rows = [
+        {
+            "email": item.email,
+            "hashed_password": password,
+            "first_name": item.first_name,
+            "last_name": item.last_name,
+            "role": item.role,
+            "is_verified": item.is_verified,
+        }
+        for item, password in zip(items, hashed)
+    ]
+    inserted = await _insert_rows(rows, db)
+    await db.commit()
+    return inserted
+
+
+async def import_users(rows: AsyncIterator[Tuple[int, Optional[dict]]], db: AsyncSession) -> dict:
+    """
+    Вставляет пользователей пачками по USER_IMPORT_CHUNK_SIZE, каждая пачка —
+    один INSERT ... ON CONFLICT (email) DO NOTHING в своей транзакции.
+    Если пул хеширования перегружен, уже вставленные пачки остаются, а строки
+    текущей и всех следующих пачек возвращаются в failed_lines.
+    """
+    inserted = total = 0
+    invalid_lines: List[int] = []
+    failed_lines: List[int] = []
+    chunk: List[Tuple[int, UserImport]] = []
+
+    async def flush() -> None:
+        nonlocal inserted, total
+        # после отказа пула следующие пачки уже не хешируем
+        if failed_lines:
+            failed_lines.extend(line_no for line_no, _ in chunk)
+            return
+        try:
+            inserted += await _insert_chunk([item for _, item in chunk], db)
+        except HTTPException as exc:
+            if exc.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
+            failed_lines.extend(line_no for line_no, _ in chunk)
+            return
+        total += len(chunk)
+
+    async for line_no, row in rows:
+        try:
+            if row is None:
+                raise ValueError
+            chunk.append((line_no, UserImport(**row)))
+        except (ValidationError, ValueError):
+            invalid_lines.append(line_no)
+            continue
+        if len(chunk) >= settings.USER_IMPORT_CHUNK_SIZE:
+            await flush()
+            chunk = []
+    if chunk:
+        await flush()
+    return {
+        "inserted": inserted,
+        "skipped": total - inserted,
+        "invalid_lines": invalid_lines,
+        "failed_lines": failed_lines,
+    }
+
+
+async def bulk_update_users(user_ids: List[int], data: UserUpdate, db: AsyncSession) -> int:
+    """
+    Применяет одни и те же изменения ко всем пользователям одним UPDATE.
+    Возвращает число обновлённых строк.
+    """
+    changes = data.model_dump(exclude_unset=True)
+    if not changes:
+        return 0
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(**changes)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await invalidate_users(user_ids)
+    return result.rowcount
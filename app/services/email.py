@@ -1,25 +1,158 @@
-from aiosmtplib import SMTP
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+from aiosmtplib import (
+    SMTP,
+    SMTPException,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+    SMTPServerDisconnected,
+)
 from email.message import EmailMessage
 from app.core.config import settings
 
-async def send_verification_email(email: str, code: str) -> None:
+
+class SMTPPool:
     """
-    Посылает на указанный email письмо с кодом верификации.
+    Пул долгоживущих авторизованных SMTP-сессий в рамках одного процесса.
+    Соединения привязаны к event loop, поэтому при смене loop пул начинается заново.
     """
+
+    def __init__(self, size: int, max_idle: float, healthcheck_after: float):
+        self.size = size
+        self.max_idle = max_idle
+        self.healthcheck_after = healthcheck_after
+        self._idle: List[Tuple[SMTP, float]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # соединения старого loop использовать нельзя — просто забываем их
+            self._loop = loop
+            self._idle = []
+            self._semaphore = asyncio.Semaphore(self.size)
+
+    async def _connect(self) -> SMTP:
+        smtp = SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASS,
+            start_tls=True,
+        )
+        # connect() сам выполняет STARTTLS и AUTH
+        await smtp.connect()
+        return smtp
+
+    async def _acquire(self) -> SMTP:
+        while self._idle:
+            smtp, released_at = self._idle.pop()
+            idle_for = time.monotonic() - released_at
+            if not smtp.is_connected or idle_for > self.max_idle:
+                smtp.close()
+                continue
+            if idle_for > self.healthcheck_after:
+                try:
+                    await smtp.noop()
+                except SMTPException:
+                    smtp.close()
+                    continue
+            return smtp
+        return await self._connect()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[SMTP]:
+        """
+        Выдаёт живое соединение из пула. Если во время работы с ним случилась
+        ошибка, соединение закрывается и в пул не возвращается.
+        """
+        self._bind_loop()
+        async with self._semaphore:
+            smtp = await self._acquire()
+            try:
+                yield smtp
+            except BaseException:
+                smtp.close()
+                raise
+            else:
+                self._idle.append((smtp, time.monotonic()))
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            try:
+                await smtp.quit()
+            except SMTPException:
+                smtp.close()
+
+
+_smtp_pool: Optional[SMTPPool] = None
+
+
+def get_smtp_pool() -> SMTPPool:
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPPool(
+            size=settings.SMTP_POOL_SIZE,
+            max_idle=settings.SMTP_POOL_MAX_IDLE_SECONDS,
+            healthcheck_after=settings.SMTP_POOL_HEALTHCHECK_SECONDS,
+        )
+    return _smtp_pool
+
+
+def build_verification_email(email: str, code: str) -> EmailMessage:
     msg = EmailMessage()
     msg["From"] = settings.SMTP_USER
     msg["To"] = email
     msg["Subject"] = "Verify your Coffee Shop account"
     msg.set_content(f"Your verification code is: {code}")
+    return msg
+
 
-    # подключаемся к SMTP-серверу
-    smtp = SMTP(
-        hostname=settings.SMTP_HOST,
-        port=settings.SMTP_PORT,
-        username=settings.SMTP_USER,
-        password=settings.SMTP_PASS,
-        start_tls=True,
-    )
-    await smtp.connect()
-    await smtp.send_message(msg)
-    await smtp.quit()
\ No newline at end of file
+async def send_verification_email(email: str, code: str) -> None:
+    """
+    Посылает на указанный email письмо с кодом верификации.
+    """
+    msg = build_verification_email(email, code)
+
+    # сервер мог закрыть простаивающее соединение — пробуем ещё раз с новым
+    try:
+        async with get_smtp_pool().connection() as smtp:
+            await smtp.send_message(msg)
+    except SMTPServerDisconnected:
+        async with get_smtp_pool().connection() as smtp:
+            await smtp.send_message(msg)
+
+
+async def send_verification_emails(messages: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Отправляет пачку писем (email, code) через одну SMTP-сессию.
+    Возвращает письма, которые отправить не удалось, — их повторяют по одному.
+    """
+    failed: List[Tuple[str, str]] = []
+    pending = list(messages)
+    reconnects = 1
+    while pending:
+        try:
+            async with get_smtp_pool().connection() as smtp:
+                while pending:
+                    email, code = pending[0]
+                    try:
+                        await smtp.send_message(build_verification_email(email, code))
+                    except (SMTPResponseException, SMTPRecipientsRefused):
+                        # сервер отверг конкретное письмо, сессия при этом жива
+                        failed.append(pending[0])
+                    pending.pop(0)
+        except (SMTPException, OSError):
+            # сессия сломалась: текущее письмо — в повтор, остальные пробуем
+            # отправить через новую сессию, но не больше одного раза за пачку
+            failed.append(pending.pop(0))
+            if reconnects == 0:
+                failed.extend(pending)
+                pending = []
+            reconnects -= 1
+    return failed
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_DURATION
+from app.services.auth import hash_password, password_needs_rehash, verify_password
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+# Число раундов bcrypt, подобранное calibrate_hash_rounds
+_calibrated_rounds: Optional[int] = None
+
+
+def _workers() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # fork из процесса с потоками (aiosqlite, asyncio) может повиснуть в дочернем,
+        # поэтому процессы пула запускаются через forkserver/spawn
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def _drop_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Забывает сломанный пул, чтобы следующий вызов создал новый.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run(operation: str, func, *args):
+    """
+    Выполняет функцию в пуле процессов, не блокируя event loop.
+    Если очередь переполнена — отвечает 503, чтобы не копить задержку.
+    """
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    started = time.perf_counter()
+    pool = _get_pool()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # процесс пула упал (OOM, segfault) — без пересоздания пула все следующие
+        # вызовы падали бы с той же ошибкой
+        logger.error("Password hashing pool is broken, restarting it")
+        _drop_pool(pool)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+    finally:
+        _pending -= 1
+        PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+
+def hash_rounds() -> Optional[int]:
+    """
+    Число раундов bcrypt для новых хешей: из настроек, по калибровке
+    или None (значение passlib по умолчанию).
+    """
+    return settings.PASSWORD_HASH_ROUNDS or _calibrated_rounds
+
+
+def needs_rehash(hashed: str) -> bool:
+    # калибровка на разных хостах может дать разное число раундов, поэтому по ней
+    # хеши только усиливаются; заданное в настройках значение применяется в обе стороны
+    return password_needs_rehash(hashed, hash_rounds(), exact=bool(settings.PASSWORD_HASH_ROUNDS))
+
+
+def _time_hash(rounds: int) -> float:
+    started = time.perf_counter()
+    hash_password("calibration", rounds)
+    return time.perf_counter() - started
+
+
+async def calibrate_hash_rounds() -> int:
+    """
+    Подбирает наибольшее число раундов bcrypt, при котором хеш в пуле процессов
+    укладывается в PASSWORD_HASH_TARGET_MS (но не меньше PASSWORD_HASH_MIN_ROUNDS).
+    Каждый следующий раунд удваивает время, поэтому хватает одного замера.
+    """
+    global _calibrated_rounds
+    base = settings.PASSWORD_HASH_MIN_ROUNDS
+    loop = asyncio.get_running_loop()
+    # лучший из трёх замеров, первый ещё включает запуск процесса пула
+    elapsed = min([await loop.run_in_executor(_get_pool(), _time_hash, base) for _ in range(3)])
+    extra = math.floor(math.log2(settings.PASSWORD_HASH_TARGET_MS / 1000 / elapsed))
+    _calibrated_rounds = min(max(base + extra, base), 31)
+    logger.info(
+        "bcrypt calibrated to %d rounds (%.1f ms at %d rounds, target %d ms)",
+        _calibrated_rounds, elapsed * 1000, base, settings.PASSWORD_HASH_TARGET_MS,
+    )
+    return _calibrated_rounds
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run("hash", hash_password, password, hash_rounds())
+
+
+def _hash_many(passwords: List[str], rounds: Optional[int]) -> List[str]:
+    return [hash_password(password, rounds) for password in passwords]
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """
+    Хеширует пачку паролей, распределяя её поровну между процессами пула.
+    """
+    size = max(1, -(-len(passwords) // _workers()))
+    parts = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hashed = await asyncio.gather(*(_run("hash", _hash_many, part, hash_rounds()) for part in parts))
+    return [h for part in hashed for h in part]
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run("verify", verify_password, plain, hashed)
+
+
+def shutdown_hash_pool() -> None:
+    """
+    Останавливает пул процессов (вызывается при остановке приложения).
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,58 @@
+import json
+
+from app.core.config import settings
+from app.core.redis import get_sync_redis
+
+# Задачи публикуются по имени, чтобы веб-процесс не импортировал код воркера
+SEND_VERIFICATION_EMAIL_TASK = "app.tasks.worker.send_verification_email_task"
+SEND_VERIFICATION_EMAILS_BATCH_TASK = "app.tasks.worker.send_verification_emails_batch_task"
+RELAY_OUTBOX_TASK = "app.tasks.worker.relay_outbox_task"
+
+# Очередь писем, ожидающих пакетной отправки, и флаг «сброс уже запланирован»
+PENDING_EMAILS_KEY = "verification_emails:pending"
+FLUSH_SCHEDULED_KEY = "verification_emails:flush_scheduled"
+# Пачка, которую отправляет задача с данным id; удаляется только после отправки
+PROCESSING_EMAILS_KEY = "verification_emails:processing:{task_id}"
+
+
+def get_celery():
+    """
+    Celery-клиент для публикации задач; загружается при первой публикации.
+    """
+    from app.core.celery_app import celery_app
+
+    return celery_app
+
+
+def enqueue_verification_email(email: str, code: str) -> None:
+    """
+    Ставит письмо с кодом верификации в отправку: отдельной задачей или,
+    при VERIFICATION_EMAIL_BATCHING, в общую пачку.
+    """
+    if not settings.VERIFICATION_EMAIL_BATCHING:
+        get_celery().send_task(SEND_VERIFICATION_EMAIL_TASK, args=[email, code])
+        return
+
+    window_ms = settings.VERIFICATION_EMAIL_BATCH_WINDOW_MS
+    pipe = get_sync_redis().pipeline()
+    pipe.rpush(PENDING_EMAILS_KEY, json.dumps([email, code]))
+    pipe.set(FLUSH_SCHEDULED_KEY, 1, nx=True, px=window_ms)
+    queued, scheduled = pipe.execute()
+
+    if scheduled:
+        # первое письмо в окне — сброс через T мс
+        get_celery().send_task(SEND_VERIFICATION_EMAILS_BATCH_TASK, countdown=window_ms / 1000)
+    elif queued % settings.VERIFICATION_EMAIL_BATCH_SIZE == 0:
+        # набралась полная пачка — не ждём окончания окна
+        get_celery().send_task(SEND_VERIFICATION_EMAILS_BATCH_TASK)
+
+
+def publish_task(task: str, args: list) -> None:
+    """
+    Публикует задачу из outbox; письма верификации идут через enqueue_verification_email,
+    чтобы учитывалась пакетная отправка.
+    """
+    if task == SEND_VERIFICATION_EMAIL_TASK:
+        enqueue_verification_email(*args)
+    else:
+        get_celery().send_task(task, args=args)
@@ -0,0 +1,43 @@
+from typing import Any, List
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.outbox import OutboxMessage
+from app.services.notifications import publish_task
+
+
+async def add_outbox_message(db: AsyncSession, task: str, args: List[Any]) -> None:
+    """
+    Добавляет задачу в outbox в текущей транзакции (commit — на вызывающем).
+    """
+    await db.execute(insert(OutboxMessage).values(task=task, args=args))
+
+
+async def relay_outbox(db: AsyncSession, batch_size: int) -> int:
+    """
+    Забирает из outbox до batch_size самых старых задач и публикует их в брокер.
+    Строки удаляются в той же транзакции: при ошибке публикации откат вернёт
+    их в outbox (доставка «хотя бы один раз»). На PostgreSQL SKIP LOCKED
+    позволяет нескольким ретрансляторам разбирать разные пачки.
+    """
+    batch = (
+        select(OutboxMessage.id)
+        .order_by(OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(OutboxMessage)
+        .where(OutboxMessage.id.in_(batch.scalar_subquery()))
+        .returning(OutboxMessage.id, OutboxMessage.task, OutboxMessage.args)
+    )
+    messages = sorted(result.all())
+    try:
+        for message in messages:
+            publish_task(message.task, message.args)
+    except Exception:
+        await db.rollback()
+        raise
+    await db.commit()
+    return len(messages)
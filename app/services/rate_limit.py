@@ -0,0 +1,120 @@
+import logging
+import math
+import time
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Скользящее окно по журналу запросов (ZSET с временем в мс) для нескольких ключей.
+# Запрос засчитывается только если ни один ключ не превысил свой лимит.
+# Возвращает 0 или сколько миллисекунд ждать до освобождения места в окне.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local member = ARGV[3]
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[3 + i])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = tonumber(oldest[2]) + window - now
+        if wait > retry_after then
+            retry_after = wait
+        end
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, window)
+end
+return 0
+"""
+
+_script = None
+
+
+def _get_script():
+    global _script
+    if _script is None:
+        _script = get_redis().register_script(SLIDING_WINDOW_SCRIPT)
+    return _script
+
+
+async def _request_email(request: Request) -> Optional[str]:
+    """
+    Достаёт email из тела запроса: поле username формы логина или email в JSON.
+    FastAPI уже прочитал тело к этому моменту, поэтому повторное чтение бесплатно.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        body = await request.json()
+        email = body.get("email") if isinstance(body, dict) else None
+    else:
+        email = (await request.form()).get("username")
+    return email.strip().lower() if isinstance(email, str) and email else None
+
+
+class RateLimit:
+    """
+    FastAPI-зависимость: ограничивает число запросов к маршруту с одного IP
+    и на один email в скользящем окне. Срабатывает до обращения к БД и bcrypt.
+    fail_open — пропускать ли запросы, когда Redis недоступен.
+    """
+
+    def __init__(self, scope: str, fail_open: bool = True):
+        self.scope = scope
+        self.fail_open = fail_open
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        ip = request.client.host if request.client else "unknown"
+        keys = [f"rate_limit:{self.scope}:ip:{ip}"]
+        limits = [settings.RATE_LIMIT_PER_IP]
+        email = await _request_email(request)
+        if email:
+            keys.append(f"rate_limit:{self.scope}:email:{email}")
+            limits.append(settings.RATE_LIMIT_PER_EMAIL)
+
+        now_ms = int(time.time() * 1000)
+        window_ms = settings.RATE_LIMIT_WINDOW_SECONDS * 1000
+        try:
+            retry_after_ms = await _get_script()(
+                keys=keys, args=[now_ms, window_ms, uuid.uuid4().hex, *limits]
+            )
+        except RedisError as exc:
+            logger.warning("Rate limiter unavailable: %s", exc)
+            # без Redis лучше пропустить запрос, чем положить авторизацию,
+            # если только лимит не единственная защита от перебора
+            if self.fail_open:
+                return
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service temporarily unavailable, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        if retry_after_ms:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(math.ceil(int(retry_after_ms) / 1000))},
+            )
+
+
+rate_limit_login = RateLimit("login")
+rate_limit_signup = RateLimit("signup")
+# короткий числовой код защищён от перебора только лимитом — без Redis проверку не пускаем
+rate_limit_verify = RateLimit("verify", fail_open=False)
@@ -0,0 +1,73 @@
+import uuid
+
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.services.auth import create_access_token, create_refresh_token, decode_token
+
+
+def _refresh_key(jti: str) -> str:
+    return f"refresh:{jti}"
+
+
+def _storage_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Token storage unavailable, try again later",
+    )
+
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or revoked refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def issue_tokens(user_id: int) -> dict:
+    """
+    Выпускает пару токенов. jti refresh-токена кладётся в Redis-allowlist
+    с TTL, равным сроку жизни токена, — запись исчезает сама.
+    """
+    jti = uuid.uuid4().hex
+    try:
+        await get_redis().set(
+            _refresh_key(jti), user_id, ex=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+        )
+    except RedisError:
+        raise _storage_unavailable()
+    return {
+        "access_token": create_access_token(user_id),
+        "refresh_token": create_refresh_token(user_id, jti),
+        "token_type": "bearer",
+    }
+
+
+async def rotate_refresh_token(token: str) -> dict:
+    """
+    Обменивает refresh-токен на новую пару. Токен одноразовый:
+    GETDEL атомарно проверяет и отзывает его за один запрос к Redis.
+    """
+    data = decode_token(token)
+    if data.typ != "refresh" or not data.jti:
+        raise _invalid_refresh_token()
+    try:
+        owner = await get_redis().getdel(_refresh_key(data.jti))
+    except RedisError:
+        raise _storage_unavailable()
+    if owner is None or int(owner) != data.user_id:
+        raise _invalid_refresh_token()
+    return await issue_tokens(data.user_id)
+
+
+async def revoke_refresh_token(token: str) -> None:
+    data = decode_token(token)
+    if data.typ != "refresh" or not data.jti:
+        raise _invalid_refresh_token()
+    try:
+        await get_redis().delete(_refresh_key(data.jti))
+    except RedisError:
+        raise _storage_unavailable()
@@ -1,41 +1,80 @@
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
+from sqlalchemy import column, delete, func, insert, literal_column, table, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from fastapi import HTTPException, status
 
-from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
-from app.services.auth import hash_password
-import uuid
+from app.core.config import settings
+from app.core.db import get_sessionmaker, read_session
+from app.models.user import RoleEnum, User
+from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.services.hashing import hash_password_async
+from app.services.notifications import SEND_VERIFICATION_EMAIL_TASK
+from app.services.outbox import add_outbox_message
+from app.services.user_cache import (
+    cache_user,
+    get_cached_user,
+    invalidate_user,
+    invalidate_users,
+    recently_changed,
+)
+from app.services.verification import VERIFICATION_TTL, generate_code, hash_code, remember_code
 
 
-async def create_user(user_in: UserCreate, db: AsyncSession) -> User:
+async def create_user(user_in: UserCreate, db: AsyncSession) -> Tuple[User, str]:
     """
-    Создаёт нового пользователя, проверяя уникальность email и создаёт код верификации.
+    Создаёт нового пользователя и код верификации одним INSERT ... RETURNING.
+    Уникальность email проверяет уникальный индекс users.email.
+    Письмо с кодом ставится в outbox в той же транзакции.
+    Возвращает пользователя и код в открытом виде (в users хранится только хеш).
     """
-    q = await db.execute(select(User).filter_by(email=user_in.email))
-    if q.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Email already registered")
-
     # Генерируем код и срок действия
-    code = str(uuid.uuid4())
-    expiry = datetime.utcnow() + timedelta(days=2)
+    code = generate_code()
+    code_hash = hash_code(user_in.email, code)
+    expiry = datetime.now(timezone.utc) + VERIFICATION_TTL
 
-    user = User(
+    stmt = insert(User).values(
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=await hash_password_async(user_in.password),
         first_name=user_in.first_name,
         last_name=user_in.last_name,
-        verification_code=code,
+        verification_code=code_hash,
         verification_expiry=expiry,
-    )
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    return user
+    ).returning(User)
+    try:
+        user = await db.scalar(stmt)
+        # код в открытом виде лежит в outbox только до публикации задачи
+        await add_outbox_message(db, SEND_VERIFICATION_EMAIL_TASK, [user.email, code])
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Email already registered")
+    await remember_code(user.email, code_hash, int(VERIFICATION_TTL.total_seconds()))
+    return user, code
+
+async def rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """
+    Перехеширует пароль с текущей стоимостью bcrypt (фоном после успешного входа).
+    Хеш заменяется, только если пароль за это время не сменили. updated_at
+    не трогаем: видимые данные не меняются, поэтому кеш и ETag остаются верными.
+    """
+    try:
+        new_hash = await hash_password_async(password)
+    except HTTPException:
+        # пул хеширования перегружен — перехешируем при следующем входе
+        return
+    async with get_sessionmaker()() as db:
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash, updated_at=User.updated_at)
+        )
+        await db.commit()
+
 
 async def get_user_by_email(email: str, db: AsyncSession) -> Optional[User]:
     """
@@ -56,25 +95,171 @@ async def get_user(user_id: int, db: AsyncSession) -> User:
                             detail="User not found")
     return user
 
-async def get_users(db: AsyncSession) -> List[User]:
+async def _get_user_for_cache(user_id: int, db: AsyncSession) -> User:
+    """
+    Читает пользователя, которого затем положат в кеш. Недавно изменённого
+    читаем с основной БД, даже если db — сессия реплики.
+    """
+    if db.info.get("replica") and await recently_changed(user_id):
+        async with get_sessionmaker()() as primary:
+            return await get_user(user_id, primary)
+    return await get_user(user_id, db)
+
+async def get_user_cached(user_id: int, db: AsyncSession) -> User:
+    """
+    Как get_user, но сначала смотрит в кеш (память процесса, затем Redis).
+    """
+    user = await get_cached_user(user_id)
+    if user is None:
+        user = await _get_user_for_cache(user_id, db)
+        await cache_user(user)
+    return user
+
+async def get_current_user_cached(user_id: int) -> User:
+    """
+    Пользователь для аутентификации: из кеша, а при промахе — короткой сессией чтения.
+    Если реплика ещё не получила только что созданного пользователя
+    или недоступна, он читается с основной БД.
+    """
+    user = await get_cached_user(user_id)
+    if user is not None:
+        return user
+    async with read_session() as db:
+        try:
+            user = await _get_user_for_cache(user_id, db)
+        except (HTTPException, DBAPIError):
+            if not db.info.get("replica"):
+                raise
+    if user is None:
+        async with get_sessionmaker()() as db:
+            user = await get_user(user_id, db)
+    await cache_user(user)
+    return user
+
+def user_etag(user: User) -> Optional[str]:
+    """
+    Сильный ETag представления пользователя: id и updated_at в микросекундах.
+    """
+    if user.updated_at is None:
+        return None
+    updated_at = user.updated_at
+    if updated_at.tzinfo is None:
+        # SQLite возвращает время без зоны, записывается оно в UTC
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return f'"{user.id}-{int(updated_at.timestamp() * 1_000_000)}"'
+
+# Только колонки, которые попадают в UserRead, — без загрузки ORM-объектов
+USER_READ_COLUMNS = tuple(getattr(User, field) for field in UserRead.model_fields)
+
+def _users_query(
+    after: Optional[int] = None,
+    role: Optional[RoleEnum] = None,
+    is_verified: Optional[bool] = None,
+):
+    """
+    Запрос полей UserRead с keyset-курсором по id и фильтрами.
+    """
+    query = select(*USER_READ_COLUMNS).order_by(User.id)
+    if after is not None:
+        query = query.filter(User.id > after)
+    if role is not None:
+        query = query.filter(User.role == role)
+    if is_verified is not None:
+        query = query.filter(User.is_verified == is_verified)
+    return query
+
+
+async def get_users(
+    db: AsyncSession,
+    limit: int = 100,
+    after: Optional[int] = None,
+    role: Optional[RoleEnum] = None,
+    is_verified: Optional[bool] = None,
+) -> List[dict]:
+    """
+    Возвращает страницу пользователей с id > after (не больше limit)
+    в виде словарей с полями UserRead.
+    """
+    q = await db.execute(_users_query(after, role, is_verified).limit(limit))
+    return [row._asdict() for row in q]
+
+
+# Выражения должны совпадать с индексами поиска из USER_SEARCH_DDL
+_FULL_NAME = literal_column("(coalesce(users.first_name, '') || ' ' || coalesce(users.last_name, ''))")
+_users_fts = table("users_fts", column("rowid"), column("users_fts"))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_users(db: AsyncSession, q: str, limit: int = 20) -> List[dict]:
     """
-    Возвращает список всех пользователей.
+    Ищет пользователей по префиксу email и по имени/фамилии.
+    Возвращает до limit словарей с полями UserRead, лучшие совпадения первыми.
     """
-    q = await db.execute(select(User))
-    return q.scalars().all()
+    terms = q.split()
+    if not terms:
+        return []
+    query = select(*USER_READ_COLUMNS).limit(limit)
+
+    if db.get_bind().dialect.name == "sqlite":
+        # каждое слово — префиксный запрос FTS5, ранжирование bm25 с приоритетом email
+        match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+        query = (
+            query.join(_users_fts, _users_fts.c.rowid == User.id)
+            .where(_users_fts.c.users_fts.op("MATCH")(match))
+            .order_by(func.bm25(literal_column("users_fts"), 10.0, 1.0, 1.0), User.id)
+        )
+    else:
+        phrase = " ".join(terms)
+        email_match = func.lower(User.email).like(_escape_like(phrase.lower()) + "%", escape="\\")
+        name_match = _FULL_NAME.ilike("%" + _escape_like(phrase) + "%", escape="\\")
+        query = query.where(email_match | name_match)
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.order_by(email_match.desc(), func.similarity(_FULL_NAME, phrase).desc(), User.id)
+        else:
+            query = query.order_by(email_match.desc(), User.id)
+
+    result = await db.execute(query)
+    return [row._asdict() for row in result]
+
+
+async def stream_users(
+    role: Optional[RoleEnum] = None,
+    is_verified: Optional[bool] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[dict]:
+    """
+    Отдаёт пользователей по одному через серверный курсор, не загружая всю таблицу.
+    Открывает собственную сессию чтения: ответ стримится уже после выхода из get_read_db.
+    """
+    query = _users_query(role=role, is_verified=is_verified).execution_options(yield_per=chunk_size)
+    async with read_session() as db:
+        result = await db.stream(query)
+        async for row in result:
+            yield row._asdict()
 
 async def update_user(user_id: int, data: UserUpdate, db: AsyncSession) -> User:
     """
-    Частично обновляет данные пользователя.
+    Частично обновляет данные пользователя одним UPDATE ... RETURNING.
     """
-    user = await get_user(user_id, db)
-    update_data = data.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(user, field, value)
+    update_data = data.model_dump(exclude_unset=True)
+    if not update_data:
+        return await get_user(user_id, db)
 
-    db.add(user)
+    user = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(**update_data)
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
     await db.commit()
-    await db.refresh(user)
+    await invalidate_user(user_id)
     return user
 
 async def delete_user(user_id: int, db: AsyncSession) -> bool:
@@ -88,19 +273,34 @@ async def delete_user(user_id: int, db: AsyncSession) -> bool:
 
     await db.delete(user)
     await db.commit()
+    await invalidate_user(user_id)
     return True
 
-async def delete_unverified_users(db: AsyncSession) -> None:
+async def delete_unverified_users(db: AsyncSession) -> int:
     """
     Удаляет всех пользователей, не прошедших верификацию за 2 дня.
+    Удаляет пачками по UNVERIFIED_CLEANUP_BATCH_SIZE, каждая пачка — один DELETE
+    в своей транзакции, чтобы не держать долгие блокировки. Удалённые сбрасываются
+    из кеша пользователей. Возвращает число удалённых.
     """
-    threshold = datetime.utcnow() - timedelta(days=2)
-    q = await db.execute(
-        select(User).filter(
-            User.is_verified == False,
-            User.created_at < threshold
-        )
+    threshold = datetime.now(timezone.utc) - timedelta(days=2)
+    batch_size = settings.UNVERIFIED_CLEANUP_BATCH_SIZE
+    stale_ids = (
+        select(User.id)
+        .filter(User.is_verified == False, User.created_at < threshold)
+        .limit(batch_size)
     )
-    for user in q.scalars().all():
-        await db.delete(user)
-    await db.commit()
+    deleted = 0
+    while True:
+        result = await db.execute(
+            delete(User)
+            .where(User.id.in_(stale_ids.scalar_subquery()))
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        user_ids = list(result.scalars())
+        await db.commit()
+        await invalidate_users(user_ids)
+        deleted += len(user_ids)
+        if len(user_ids) < batch_size:
+            return deleted
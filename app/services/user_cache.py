@@ -0,0 +1,146 @@
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import RoleEnum, User
+
+logger = logging.getLogger(__name__)
+
+# Поля, которые нужны аутентифицированным маршрутам (без хеша пароля)
+CACHED_FIELDS = ("id", "email", "first_name", "last_name", "is_verified", "role", "updated_at")
+
+_local_cache: Optional[TTLCache] = None
+# Недавно изменённые пользователи этого процесса (см. recently_changed)
+_changed_cache: Optional[TTLCache] = None
+
+# Счётчики попаданий: local_hit, redis_hit, miss
+stats: Counter = Counter()
+
+
+def _local() -> TTLCache:
+    global _local_cache
+    if _local_cache is None:
+        _local_cache = TTLCache(maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_LOCAL_TTL_SECONDS)
+    return _local_cache
+
+
+def _changed() -> TTLCache:
+    global _changed_cache
+    if _changed_cache is None:
+        _changed_cache = TTLCache(maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_REPLICA_LAG_SECONDS)
+    return _changed_cache
+
+
+def _key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _changed_key(user_id: int) -> str:
+    return f"user:{user_id}:changed"
+
+
+def _dump(user: User) -> dict:
+    data = {field: getattr(user, field) for field in CACHED_FIELDS}
+    data["role"] = RoleEnum(data["role"]).value
+    if data["updated_at"] is not None:
+        data["updated_at"] = data["updated_at"].isoformat()
+    return data
+
+
+def _load(data: dict) -> User:
+    # объект не привязан к сессии и содержит только CACHED_FIELDS;
+    # у записей, сохранённых до появления updated_at, его нет
+    updated_at = data.get("updated_at")
+    return User(**{
+        **data,
+        "role": RoleEnum(data["role"]),
+        "updated_at": datetime.fromisoformat(updated_at) if updated_at else None,
+    })
+
+
+async def get_cached_user(user_id: int) -> Optional[User]:
+    """
+    Ищет пользователя сначала в памяти процесса, затем в Redis.
+    """
+    data = _local().get(user_id)
+    if data is not None:
+        stats["local_hit"] += 1
+        return _load(data)
+
+    if settings.USER_CACHE_REDIS_ENABLED:
+        try:
+            raw = await get_redis().get(_key(user_id))
+        except RedisError as exc:
+            logger.warning("User cache read failed: %s", exc)
+            raw = None
+        if raw is not None:
+            stats["redis_hit"] += 1
+            data = json.loads(raw)
+            _local().set(user_id, data)
+            return _load(data)
+
+    stats["miss"] += 1
+    return None
+
+
+async def cache_user(user: User) -> None:
+    data = _dump(user)
+    _local().set(user.id, data)
+    if settings.USER_CACHE_REDIS_ENABLED:
+        try:
+            await get_redis().set(_key(user.id), json.dumps(data), ex=settings.USER_CACHE_TTL_SECONDS)
+        except RedisError as exc:
+            logger.warning("User cache write failed: %s", exc)
+
+
+async def invalidate_user(user_id: int) -> None:
+    """
+    Сбрасывает закешированного пользователя после изменения или удаления.
+    Другие процессы увидят изменения не позже USER_CACHE_LOCAL_TTL_SECONDS.
+    """
+    await invalidate_users([user_id])
+
+
+async def invalidate_users(user_ids: List[int]) -> None:
+    lag = settings.USER_CACHE_REPLICA_LAG_SECONDS
+    for user_id in user_ids:
+        _local().pop(user_id)
+        if lag:
+            _changed().set(user_id, True)
+    if settings.USER_CACHE_REDIS_ENABLED and user_ids:
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.delete(*(_key(user_id) for user_id in user_ids))
+                if lag:
+                    for user_id in user_ids:
+                        pipe.set(_changed_key(user_id), 1, ex=lag)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning("User cache invalidation failed: %s", exc)
+
+
+async def recently_changed(user_id: int) -> bool:
+    """
+    Менялся ли пользователь за последние USER_CACHE_REPLICA_LAG_SECONDS секунд.
+    Такого пользователя нельзя кешировать с реплики: она могла ещё не получить
+    изменение, и старая строка жила бы в кеше до USER_CACHE_TTL_SECONDS.
+    """
+    if not settings.USER_CACHE_REPLICA_LAG_SECONDS:
+        return False
+    if _changed().get(user_id) is not None:
+        return True
+    if not settings.USER_CACHE_REDIS_ENABLED:
+        return False
+    try:
+        return bool(await get_redis().exists(_changed_key(user_id)))
+    except RedisError as exc:
+        logger.warning("User cache change marker read failed: %s", exc)
+        # не знаем — читаем с основной БД
+        return True
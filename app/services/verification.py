@@ -0,0 +1,127 @@
+import hashlib
+import hmac
+import logging
+import secrets
+from datetime import timedelta
+from typing import Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import User
+from app.services.user_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# Сколько действует код верификации
+VERIFICATION_TTL = timedelta(days=2)
+
+
+def _key(email: str) -> str:
+    return f"verify:{email}"
+
+
+def _attempts_key(email: str) -> str:
+    return f"verify:attempts:{email}"
+
+
+def generate_code() -> str:
+    """
+    Короткий числовой код, который удобно ввести с телефона.
+    """
+    digits = settings.VERIFICATION_CODE_DIGITS
+    return f"{secrets.randbelow(10 ** digits):0{digits}d}"
+
+
+def hash_code(email: str, code: str) -> str:
+    """
+    В БД и Redis хранится только HMAC кода, привязанный к email.
+    """
+    message = f"{email}:{code}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+async def remember_code(email: str, code_hash: str, ttl_seconds: int) -> None:
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.set(_key(email), code_hash, ex=ttl_seconds)
+            # у нового кода свой счётчик неверных попыток
+            pipe.delete(_attempts_key(email))
+            await pipe.execute()
+    except RedisError as exc:
+        logger.warning("Verification code cache write failed: %s", exc)
+
+
+async def _count_failed_attempt(email: str, db: AsyncSession) -> None:
+    """
+    Считает неверные попытки; после VERIFICATION_MAX_ATTEMPTS код сгорает
+    и перебрать его дальше уже нельзя, как бы ни был настроен лимит запросов.
+    """
+    key = _attempts_key(email)
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, int(VERIFICATION_TTL.total_seconds()))
+            attempts, _ = await pipe.execute()
+    except RedisError as exc:
+        logger.warning("Verification attempt counter failed: %s", exc)
+        return
+    if attempts < settings.VERIFICATION_MAX_ATTEMPTS:
+        return
+
+    logger.warning("Verification code burned after %d failed attempts", attempts)
+    await db.execute(
+        update(User)
+        .where(User.email == email, User.is_verified.is_(False), User.verification_code.is_not(None))
+        .values(verification_code=None, verification_expiry=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    try:
+        await get_redis().delete(_key(email))
+    except RedisError as exc:
+        logger.warning("Verification code cache cleanup failed: %s", exc)
+
+
+async def verify_code(email: str, code: str, db: AsyncSession) -> Optional[int]:
+    """
+    Подтверждает пользователя и возвращает его ID или None, если код неверный
+    или просрочен. Неверный код отсекается по Redis без обращения к БД;
+    верный подтверждается одним условным UPDATE ... RETURNING.
+    Неверные попытки считаются, см. _count_failed_attempt.
+    """
+    code_hash = hash_code(email, code)
+    try:
+        cached = await get_redis().get(_key(email))
+    except RedisError as exc:
+        logger.warning("Verification code cache read failed: %s", exc)
+        cached = None
+    if cached is not None and not hmac.compare_digest(cached, code_hash):
+        await _count_failed_attempt(email, db)
+        return None
+
+    user_id = await db.scalar(
+        update(User)
+        .where(
+            User.email == email,
+            User.verification_code == code_hash,
+            User.verification_expiry > func.now(),
+        )
+        .values(is_verified=True, verification_code=None, verification_expiry=None)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if user_id is None:
+        await _count_failed_attempt(email, db)
+        return None
+
+    try:
+        await get_redis().delete(_key(email), _attempts_key(email))
+    except RedisError as exc:
+        logger.warning("Verification code cache cleanup failed: %s", exc)
+    await invalidate_user(user_id)
+    return user_id
@@ -0,0 +1,28 @@
+import time
+
+from celery.signals import task_postrun, task_prerun, worker_ready
+from prometheus_client import start_http_server
+
+from app.core.config import settings
+from app.core.metrics import CELERY_TASK_DURATION, get_registry
+
+_started_at = {}
+
+
+@task_prerun.connect
+def _on_task_start(task_id=None, **_):
+    _started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _on_task_finish(task_id=None, task=None, state=None, **_):
+    started = _started_at.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+@worker_ready.connect
+def _start_metrics_server(**_):
+    # в prefork метрики дочерних процессов видны только при PROMETHEUS_MULTIPROC_DIR
+    if settings.METRICS_ENABLED and settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=get_registry())
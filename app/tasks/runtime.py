@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.db import make_engine, make_sessionmaker
+from app.services.email import get_smtp_pool
+
+T = TypeVar("T")
+
+# Долгоживущий event loop процесса воркера и собственный пул соединений с БД
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_engine: Optional[AsyncEngine] = None
+_session_factory = None
+_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _ensure_started() -> asyncio.AbstractEventLoop:
+    """
+    Запускает loop в фоновом потоке при первом обращении в этом процессе.
+    После fork состояние родителя не используется.
+    """
+    global _loop, _engine, _session_factory, _pid
+    with _lock:
+        if _loop is None or _pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="celery-asyncio", daemon=True).start()
+            _engine = make_engine()
+            _session_factory = make_sessionmaker(_engine)
+            _pid = os.getpid()
+        return _loop
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    Выполняет корутину в loop воркера и ждёт результат.
+    """
+    loop = _ensure_started()
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def session() -> AsyncSession:
+    """
+    Новая сессия на движке воркера (использовать только внутри run_async).
+    """
+    _ensure_started()
+    return _session_factory()
+
+
+@worker_process_init.connect
+def _on_process_init(**_):
+    _ensure_started()
+
+
+@worker_process_shutdown.connect
+def _on_process_shutdown(**_):
+    global _loop
+    if _loop is None or _pid != os.getpid():
+        return
+
+    async def _close():
+        await get_smtp_pool().close()
+        await _engine.dispose()
+
+    asyncio.run_coroutine_threadsafe(_close(), _loop).result(timeout=10)
+    _loop.call_soon_threadsafe(_loop.stop)
+    _loop = None
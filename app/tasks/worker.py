@@ -1,9 +1,22 @@
+import json
+
 from celery.utils.log import get_task_logger
 from app.core.celery_app import celery_app
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.db import AsyncSessionLocal
+from app.core.config import settings
+from app.core.redis import get_sync_redis
 from app.services.user import delete_unverified_users
-from app.services.email import send_verification_email
+from app.services.email import send_verification_email, send_verification_emails
+from app.services.outbox import relay_outbox
+from app.services.notifications import (
+    FLUSH_SCHEDULED_KEY,
+    PENDING_EMAILS_KEY,
+    PROCESSING_EMAILS_KEY,
+    RELAY_OUTBOX_TASK,
+    SEND_VERIFICATION_EMAIL_TASK,
+    SEND_VERIFICATION_EMAILS_BATCH_TASK,
+)
+from app.tasks.runtime import run_async, session
+from app.tasks import metrics  # noqa: F401 — регистрирует сигналы метрик
 
 logger = get_task_logger(__name__)
 
@@ -13,25 +26,101 @@ def delete_unverified_users_task():
     Удаляет из БД пользователей, не подтвердивших email в течение 2 дней.
     Запускается раз в сутки (с midnight).
     """
-    import asyncio
-
     async def _cleanup():
-        async with AsyncSessionLocal() as db:
-            await delete_unverified_users(db)
-            logger.info("Deleted unverified users older than 2 days")
+        async with session() as db:
+            deleted = await delete_unverified_users(db)
+            logger.info(f"Deleted {deleted} unverified users older than 2 days")
+
+    run_async(_cleanup())
 
-    asyncio.run(_cleanup())
 
+@celery_app.task(name=RELAY_OUTBOX_TASK)
+def relay_outbox_task():
+    """
+    Публикует задачи из outbox пачками по OUTBOX_RELAY_BATCH_SIZE, пока он не опустеет.
+    """
+    async def _relay():
+        total = 0
+        while True:
+            async with session() as db:
+                sent = await relay_outbox(db, settings.OUTBOX_RELAY_BATCH_SIZE)
+            total += sent
+            if sent < settings.OUTBOX_RELAY_BATCH_SIZE:
+                return total
 
-@celery_app.task(name="app.tasks.worker.send_verification_email_task")
+    sent = run_async(_relay())
+    if sent:
+        logger.info(f"Relayed {sent} outbox messages")
+
+
+@celery_app.task(name=SEND_VERIFICATION_EMAIL_TASK)
 def send_verification_email_task(email: str, code: str):
     """
     Фоновая задача отправки письма с кодом верификации.
     """
-    import asyncio
-
     async def _send():
         await send_verification_email(email, code)
         logger.info(f"Sent verification email to {email}")
 
-    asyncio.run(_send())
\ No newline at end of file
+    run_async(_send())
+
+
+def _claim_batch(redis, processing_key: str) -> list:
+    """
+    Переносит до VERIFICATION_EMAIL_BATCH_SIZE писем из общей очереди в список
+    этой задачи. При повторной доставке задачи после падения воркера её список
+    уже заполнен — тогда досылается он.
+    """
+    items = redis.lrange(processing_key, 0, -1)
+    if items:
+        return items
+    pipe = redis.pipeline()
+    for _ in range(settings.VERIFICATION_EMAIL_BATCH_SIZE):
+        pipe.lmove(PENDING_EMAILS_KEY, processing_key, "LEFT", "RIGHT")
+    # страховка на случай, если задачу так и не доставят повторно
+    pipe.expire(processing_key, 24 * 3600)
+    *moved, _ = pipe.execute()
+    return [item for item in moved if item is not None]
+
+
+@celery_app.task(
+    name=SEND_VERIFICATION_EMAILS_BATCH_TASK,
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def send_verification_emails_batch_task(self):
+    """
+    Забирает из Redis до VERIFICATION_EMAIL_BATCH_SIZE накопившихся писем и
+    отправляет их через одну SMTP-сессию. Неудачные письма повторяются по одному.
+    Пачка удаляется из Redis только после отправки, поэтому падение воркера
+    посреди пачки не теряет письма (задача подтверждается после выполнения).
+    """
+    redis = get_sync_redis()
+    # новые письма после этого момента запланируют следующий сброс сами
+    redis.delete(FLUSH_SCHEDULED_KEY)
+    processing_key = PROCESSING_EMAILS_KEY.format(task_id=self.request.id)
+    items = _claim_batch(redis, processing_key)
+    if not items:
+        return
+    messages = [tuple(json.loads(item)) for item in items]
+
+    try:
+        failed = run_async(send_verification_emails(messages))
+    except Exception:
+        # пачка не отправлена — возвращаем её в начало общей очереди
+        pipe = redis.pipeline()
+        pipe.lpush(PENDING_EMAILS_KEY, *reversed(items))
+        pipe.delete(processing_key)
+        pipe.execute()
+        raise
+    for email, code in failed:
+        send_verification_email_task.apply_async(
+            (email, code), countdown=settings.VERIFICATION_EMAIL_RETRY_DELAY_SECONDS
+        )
+    redis.delete(processing_key)
+    logger.info(f"Sent {len(messages) - len(failed)} verification emails in batch, {len(failed)} queued for retry")
+
+    # очередь выросла больше одной пачки — продолжаем без ожидания окна
+    if redis.llen(PENDING_EMAILS_KEY):
+        send_verification_emails_batch_task.delay()
@@ -0,0 +1,114 @@
+"""
+Counts database round trips made by create_user and update_user.
+
+Compares the previous implementations (pre-SELECT / get + setattr + refresh)
+with the current INSERT/UPDATE ... RETURNING ones. Every cursor execution and
+every COMMIT is counted as one round trip.
+
+    python -m benchmarks.round_trips
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SMTP_HOST", "localhost")
+os.environ.setdefault("SMTP_PORT", "25")
+os.environ.setdefault("SMTP_USER", "benchmark")
+os.environ.setdefault("SMTP_PASS", "benchmark")
+os.environ.setdefault("USER_CACHE_REDIS_ENABLED", "false")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from sqlalchemy import event
+from sqlalchemy.future import select
+
+from app.core.db import Base, dispose_engine, get_engine, get_sessionmaker
+from app.models.user import RoleEnum, User
+from app.schemas.user import UserCreate, UserUpdate
+from app.services import user as user_service
+
+
+class RoundTripCounter:
+    def __init__(self, sync_engine):
+        self.count = 0
+        event.listen(sync_engine, "before_cursor_execute", self._statement)
+        event.listen(sync_engine, "commit", self._commit)
+
+    def _statement(self, *args):
+        self.count += 1
+
+    def _commit(self, conn):
+        self.count += 1
+
+
+async def legacy_create_user(user_in: UserCreate, db) -> User:
+    q = await db.execute(select(User).filter_by(email=user_in.email))
+    if q.scalar_one_or_none():
+        raise RuntimeError("Email already registered")
+    user = User(
+        email=user_in.email,
+        hashed_password="x",
+        first_name=user_in.first_name,
+        last_name=user_in.last_name,
+        verification_code="code",
+        verification_expiry=datetime.utcnow() + timedelta(days=2),
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def legacy_update_user(user_id: int, data: UserUpdate, db) -> User:
+    user = await user_service.get_user(user_id, db)
+    for field, value in data.model_dump(exclude_unset=True).items():
+        setattr(user, field, value)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def _measure(counter: RoundTripCounter, call) -> int:
+    async with get_sessionmaker()() as db:
+        before = counter.count
+        await call(db)
+        return counter.count - before
+
+
+async def main() -> None:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    counter = RoundTripCounter(get_engine().sync_engine)
+
+    async def fake_hash(password: str) -> str:
+        return "x"
+
+    # хеширование к числу обращений к БД не относится
+    user_service.hash_password_async = fake_hash
+
+    changes = UserUpdate(first_name="New", last_name="Name", role=RoleEnum.admin)
+    rows = [
+        (
+            "create_user",
+            await _measure(counter, lambda db: legacy_create_user(UserCreate(email="a@example.com", password="p", first_name="A", last_name="B"), db)),
+            await _measure(counter, lambda db: user_service.create_user(UserCreate(email="b@example.com", password="p", first_name="A", last_name="B"), db)),
+        ),
+        (
+            "update_user",
+            await _measure(counter, lambda db: legacy_update_user(1, changes, db)),
+            await _measure(counter, lambda db: user_service.update_user(1, changes, db)),
+        ),
+    ]
+    print(f"{'operation':<14}{'before':>8}{'after':>8}")
+    for name, before, after in rows:
+        print(f"{name:<14}{before:>8}{after:>8}")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
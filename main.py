@@ -1,8 +1,53 @@
+import sys
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from app.core.config import settings
-from app.routers import auth, users
+from app.core.db import dispose_engine
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import QueryProfilingMiddleware, profiling_available
+from app.core.redis import close_redis
+from app.routers import auth, debug, metrics, users
+from app.services.hashing import calibrate_hash_rounds, shutdown_hash_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # движок БД, Redis и Celery создаются лениво при первом использовании,
+    # здесь только калибруем bcrypt и закрываем то, что успело открыться
+    if settings.PASSWORD_HASH_TARGET_MS and not settings.PASSWORD_HASH_ROUNDS:
+        await calibrate_hash_rounds()
+    yield
+    shutdown_hash_pool()
+    await close_redis()
+    await dispose_engine()
+    celery = sys.modules.get("app.core.celery_app")
+    if celery is not None:
+        celery.celery_app.close()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan, default_response_class=ORJSONResponse)
+
+    app.include_router(auth.router, prefix="/auth", tags=["auth"])
+    app.include_router(users.router, prefix="/users", tags=["users"])
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics.router)
+
+    if profiling_available():
+        app.add_middleware(QueryProfilingMiddleware)
+        app.include_router(debug.router)
+
+    return app
 
-app = FastAPI(title=settings.PROJECT_NAME)
 
-app.include_router(auth.router, prefix="/auth", tags=["auth"])
-app.include_router(users.router, prefix="/users", tags=["users"])
\ No newline at end of file
+def __getattr__(name):
+    # «uvicorn main:app» получает приложение через этот хук — импорт main
+    # сам по себе ничего не создаёт и не читает настройки
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
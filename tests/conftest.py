@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+# настройки читаются при первом обращении, поэтому окружение задаётся до импорта приложения
+_tmp_dir = tempfile.mkdtemp(prefix="coffee-shop-tests-")
+os.environ.update(
+    SECRET_KEY="test-secret",
+    DATABASE_URL=f"sqlite+aiosqlite:///{_tmp_dir}/test.db",
+    REDIS_URL="redis://localhost:6379/0",
+    SMTP_HOST="localhost",
+    SMTP_PORT="25",
+    SMTP_USER="test",
+    SMTP_PASS="test",
+    METRICS_ENABLED="false",
+    PASSWORD_HASH_ROUNDS="4",
+)
+
+import fakeredis
+import httpx
+import pytest
+
+from app.core import redis as app_redis
+from app.core.db import Base, dispose_engine, get_engine, get_sessionmaker
+from app.services import auth, rate_limit, user_cache
+from app.services.hashing import shutdown_hash_pool
+from main import create_app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def hash_pool():
+    # приложение без lifespan: пул процессов bcrypt закрываем сами
+    yield
+    shutdown_hash_pool()
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """
+    Redis в памяти процесса; server.connected = False имитирует недоступный Redis.
+    """
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(app_redis, "_client", fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(app_redis, "_sync_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    # скрипт и кеши привязаны к прошлому клиенту и прошлым тестам
+    monkeypatch.setattr(rate_limit, "_script", None)
+    monkeypatch.setattr(user_cache, "_local_cache", None)
+    monkeypatch.setattr(user_cache, "_changed_cache", None)
+    monkeypatch.setattr(auth, "_token_cache", None)
+    return server
+
+
+@pytest.fixture
+async def db():
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with get_sessionmaker()() as session:
+        yield session
+    # движок привязан к event loop теста
+    await dispose_engine()
+
+
+@pytest.fixture
+async def client(redis_server, db):
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,124 @@
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models.user import RoleEnum, User
+from app.services import bulk
+from app.services.auth import create_access_token
+from app.services.bulk import import_users, iter_lines, parse_rows
+
+USERS = "/users/users"
+
+
+async def _chunks(data: bytes, size: int = 7):
+    # границы чанков нарочно режут строки и многобайтовые символы
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _rows(text: str, is_csv: bool = False):
+    return parse_rows(iter_lines(_chunks(text.encode())), is_csv=is_csv)
+
+
+async def _parse(text: str, is_csv: bool):
+    return [row async for row in _rows(text, is_csv)]
+
+
+async def _admin_headers(db):
+    admin = User(email="admin@example.com", hashed_password="x", role=RoleEnum.admin)
+    db.add(admin)
+    await db.commit()
+    return {"Authorization": f"Bearer {create_access_token(admin.id)}"}
+
+
+async def test_csv_omits_empty_cells_and_keeps_multiline_fields():
+    text = (
+        "email,password,first_name,last_name,is_verified\r\n"
+        "a@example.com,p,Ann,,\r\n"
+        '"b@example.com",p,"Bob\nthe second","O""Neil",false\r\n'
+        "\r\n"
+        "c@example.com,p,Карл,Юнг,true\r\n"
+    )
+
+    rows = await _parse(text, is_csv=True)
+
+    assert rows == [
+        (2, {"email": "a@example.com", "password": "p", "first_name": "Ann"}),
+        (3, {"email": "b@example.com", "password": "p", "first_name": "Bob\nthe second",
+             "last_name": 'O"Neil', "is_verified": "false"}),
+        (6, {"email": "c@example.com", "password": "p", "first_name": "Карл",
+             "last_name": "Юнг", "is_verified": "true"}),
+    ]
+
+
+async def test_csv_unterminated_quote_is_invalid():
+    rows = await _parse('email,password\na@example.com,"p\n', is_csv=True)
+
+    assert rows == [(2, None)]
+
+
+async def test_ndjson_reports_unreadable_lines():
+    text = '{"email": "a@example.com", "password": "p"}\n\nnot json\n[1, 2]\n'
+
+    rows = await _parse(text, is_csv=False)
+
+    assert rows == [(1, {"email": "a@example.com", "password": "p"}), (3, None), (4, None)]
+
+
+async def test_import_over_api(client, db):
+    db.add(User(email="taken@example.com", hashed_password="x"))
+    await db.commit()
+    text = (
+        '{"email": "a@example.com", "password": "p"}\n'
+        '{"email": "taken@example.com", "password": "p"}\n'
+        '{"email": "not-an-email", "password": "p"}\n'
+    )
+
+    r = await client.post(
+        f"{USERS}/bulk",
+        content=text,
+        headers={**await _admin_headers(db), "Content-Type": "application/x-ndjson"},
+    )
+
+    assert r.status_code == 200
+    assert r.json() == {"inserted": 1, "skipped": 1, "invalid_lines": [3], "failed_lines": []}
+    user = await db.scalar(select(User).where(User.email == "a@example.com"))
+    assert user.is_verified and user.role == RoleEnum.user
+
+
+async def test_import_without_on_conflict_support(db, monkeypatch):
+    db.add(User(email="taken@example.com", hashed_password="x"))
+    await db.commit()
+    monkeypatch.setattr(db.get_bind().dialect, "name", "mssql")
+    text = "".join(
+        f'{{"email": "{email}", "password": "p"}}\n'
+        for email in ("a@example.com", "taken@example.com", "a@example.com")
+    )
+
+    result = await import_users(_rows(text), db)
+
+    assert (result["inserted"], result["skipped"]) == (1, 2)
+    monkeypatch.undo()
+    assert await db.scalar(select(func.count()).select_from(User)) == 2
+
+
+async def test_import_reports_rows_left_after_hashing_pool_overload(db, monkeypatch):
+    monkeypatch.setattr(settings, "USER_IMPORT_CHUNK_SIZE", 2)
+    calls = 0
+    real_hash = bulk.hash_passwords_async
+
+    async def flaky_hash(passwords):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="busy")
+        return await real_hash(passwords)
+
+    monkeypatch.setattr(bulk, "hash_passwords_async", flaky_hash)
+    text = "".join(f'{{"email": "u{i}@example.com", "password": "p"}}\n' for i in range(5))
+
+    result = await import_users(_rows(text), db)
+
+    assert result == {"inserted": 2, "skipped": 0, "invalid_lines": [], "failed_lines": [3, 4, 5]}
+    assert calls == 2
+    assert await db.scalar(select(func.count()).select_from(User)) == 2
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.user import delete_unverified_users
+from app.services.user_cache import cache_user, get_cached_user
+
+
+async def _create_user(db, email, is_verified, age):
+    user = User(
+        email=email,
+        hashed_password="x",
+        is_verified=is_verified,
+        created_at=datetime.now(timezone.utc) - age,
+    )
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def test_deletes_only_stale_unverified_users(db, redis_server, monkeypatch):
+    monkeypatch.setattr(settings, "UNVERIFIED_CLEANUP_BATCH_SIZE", 2)
+    for i in range(3):
+        await _create_user(db, f"stale{i}@example.com", False, timedelta(days=3))
+    await _create_user(db, "fresh@example.com", False, timedelta(hours=1))
+    await _create_user(db, "verified@example.com", True, timedelta(days=3))
+
+    assert await delete_unverified_users(db) == 3
+
+    emails = set(await db.scalars(select(User.email)))
+    assert emails == {"fresh@example.com", "verified@example.com"}
+
+
+async def test_deleted_users_are_evicted_from_cache(db, redis_server):
+    user = await _create_user(db, "stale@example.com", False, timedelta(days=3))
+    await cache_user(user)
+
+    await delete_unverified_users(db)
+
+    assert await get_cached_user(user.id) is None
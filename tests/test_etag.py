@@ -0,0 +1,77 @@
+import pytest
+
+from app.models.user import RoleEnum, User
+from app.services import user_cache
+from app.services.auth import create_access_token
+
+USERS = "/users/users"
+
+
+async def _create_user(db, email, role=RoleEnum.user):
+    user = User(email=email, hashed_password="x", first_name="Old", role=role)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+async def test_response_carries_strong_etag(client, db):
+    user = await _create_user(db, "a@example.com")
+
+    r = await client.get(f"{USERS}/me", headers=_auth(user))
+
+    assert r.status_code == 200
+    assert r.headers["ETag"].startswith(f'"{user.id}-')
+    assert not r.headers["ETag"].startswith("W/")
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+async def test_matching_etag_gives_304(client, db, if_none_match):
+    user = await _create_user(db, "a@example.com")
+    etag = (await client.get(f"{USERS}/me", headers=_auth(user))).headers["ETag"]
+
+    r = await client.get(
+        f"{USERS}/me",
+        headers={**_auth(user), "If-None-Match": if_none_match.format(etag=etag)},
+    )
+
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["ETag"] == etag
+
+
+async def test_other_etag_gives_full_response(client, db):
+    user = await _create_user(db, "a@example.com")
+
+    r = await client.get(f"{USERS}/me", headers={**_auth(user), "If-None-Match": '"1-0"'})
+
+    assert r.status_code == 200
+    assert r.json()["email"] == "a@example.com"
+
+
+async def test_etag_is_the_same_from_cache_and_database(client, db):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    user = await _create_user(db, "a@example.com")
+    from_db = (await client.get(f"{USERS}/{user.id}", headers=_auth(admin))).headers["ETag"]
+
+    from_cache = (await client.get(f"{USERS}/{user.id}", headers=_auth(admin))).headers["ETag"]
+    user_cache._local_cache = None
+    from_redis = (await client.get(f"{USERS}/{user.id}", headers=_auth(admin))).headers["ETag"]
+
+    assert from_db == from_cache == from_redis
+
+
+async def test_update_changes_etag(client, db):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    user = await _create_user(db, "a@example.com")
+    etag = (await client.get(f"{USERS}/{user.id}", headers=_auth(admin))).headers["ETag"]
+
+    await client.patch(f"{USERS}/{user.id}", json={"first_name": "New"}, headers=_auth(admin))
+
+    r = await client.get(f"{USERS}/{user.id}", headers={**_auth(admin), "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert r.json()["first_name"] == "New"
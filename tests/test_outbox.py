@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.redis import get_sync_redis
+from app.models.outbox import OutboxMessage
+from app.services import notifications, outbox
+from app.services.notifications import (
+    PENDING_EMAILS_KEY,
+    SEND_VERIFICATION_EMAIL_TASK,
+    SEND_VERIFICATION_EMAILS_BATCH_TASK,
+)
+from app.services.outbox import add_outbox_message, relay_outbox
+
+SIGNUP = {"email": "new@example.com", "password": "secret", "first_name": "A", "last_name": "B"}
+
+
+class _Celery:
+    def __init__(self):
+        self.sent = []
+
+    def send_task(self, name, args=None, countdown=None):
+        self.sent.append((name, args))
+
+
+@pytest.fixture
+def celery(monkeypatch):
+    fake = _Celery()
+    monkeypatch.setattr(notifications, "get_celery", lambda: fake)
+    return fake
+
+
+async def _outbox_count(db):
+    return await db.scalar(select(func.count()).select_from(OutboxMessage))
+
+
+async def test_signup_writes_email_to_outbox_without_publishing(client, db, celery):
+    r = await client.post("/auth/signup", json=SIGNUP)
+    assert r.status_code == 200
+
+    message = await db.scalar(select(OutboxMessage))
+    assert message.task == SEND_VERIFICATION_EMAIL_TASK
+    assert message.args[0] == "new@example.com"
+    assert celery.sent == []
+
+
+async def test_failed_signup_leaves_no_outbox_message(client, db, celery):
+    await client.post("/auth/signup", json=SIGNUP)
+    await relay_outbox(db, batch_size=10)
+
+    r = await client.post("/auth/signup", json=SIGNUP)
+
+    assert r.status_code == 400
+    assert await _outbox_count(db) == 0
+
+
+async def test_relay_publishes_in_order_and_deletes(db, redis_server, celery):
+    for i in range(3):
+        await add_outbox_message(db, "app.tasks.worker.other_task", [i])
+    await db.commit()
+
+    assert await relay_outbox(db, batch_size=2) == 2
+    assert await relay_outbox(db, batch_size=2) == 1
+
+    assert celery.sent == [("app.tasks.worker.other_task", [i]) for i in range(3)]
+    assert await _outbox_count(db) == 0
+
+
+async def test_failed_publish_keeps_messages(db, monkeypatch):
+    await add_outbox_message(db, "app.tasks.worker.other_task", [1])
+    await db.commit()
+
+    def broken_publish(task, args):
+        raise ConnectionError("broker is down")
+
+    monkeypatch.setattr(outbox, "publish_task", broken_publish)
+    with pytest.raises(ConnectionError):
+        await relay_outbox(db, batch_size=10)
+
+    assert await _outbox_count(db) == 1
+
+
+async def test_relayed_email_goes_through_batching(db, redis_server, celery, monkeypatch):
+    monkeypatch.setattr(settings, "VERIFICATION_EMAIL_BATCHING", True)
+    await add_outbox_message(db, SEND_VERIFICATION_EMAIL_TASK, ["a@example.com", "123456"])
+    await db.commit()
+
+    await relay_outbox(db, batch_size=10)
+
+    assert [json.loads(item) for item in get_sync_redis().lrange(PENDING_EMAILS_KEY, 0, -1)] == [
+        ["a@example.com", "123456"]
+    ]
+    assert celery.sent == [(SEND_VERIFICATION_EMAILS_BATCH_TASK, None)]
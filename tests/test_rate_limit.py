@@ -0,0 +1,55 @@
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.services.rate_limit import _get_script
+
+WINDOW_MS = 60_000
+
+
+async def _hit(keys, limits, now_ms, member):
+    return await _get_script()(keys=keys, args=[now_ms, WINDOW_MS, member, *limits])
+
+
+async def test_sliding_window_allows_up_to_limit(redis_server):
+    assert await _hit(["k"], [2], 1_000, "a") == 0
+    assert await _hit(["k"], [2], 2_000, "b") == 0
+
+    # место освободится, когда первый запрос выйдет из окна
+    assert await _hit(["k"], [2], 3_000, "c") == 1_000 + WINDOW_MS - 3_000
+    assert await _hit(["k"], [2], 1_000 + WINDOW_MS + 1, "d") == 0
+
+
+async def test_rejected_request_is_not_counted_for_any_key(redis_server):
+    assert await _hit(["ip", "email"], [10, 1], 1_000, "a") == 0
+
+    assert await _hit(["ip", "email"], [10, 1], 2_000, "b") > 0
+
+    assert await get_redis().zcard("ip") == 1
+    assert await get_redis().zcard("email") == 1
+
+
+async def test_login_is_limited_per_email(client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_EMAIL", 2)
+    form = {"username": "nobody@example.com", "password": "wrong"}
+
+    for _ in range(2):
+        r = await client.post("/auth/login", data=form)
+        assert r.status_code == 401
+
+    r = await client.post("/auth/login", data=form)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) > 0
+
+    # лимит по email не мешает входу с другим email
+    r = await client.post("/auth/login", data={**form, "username": "other@example.com"})
+    assert r.status_code == 401
+
+
+async def test_verify_fails_closed_without_redis(client, redis_server):
+    redis_server.connected = False
+
+    r = await client.post("/auth/verify", json={"email": "a@example.com", "code": "123456"})
+    assert r.status_code == 503
+
+    # вход без Redis по-прежнему пропускается
+    r = await client.post("/auth/login", data={"username": "a@example.com", "password": "wrong"})
+    assert r.status_code == 401
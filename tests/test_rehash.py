@@ -0,0 +1,48 @@
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.auth import create_access_token, hash_password, verify_password
+
+USERS = "/users/users"
+
+
+async def _create_user(db, rounds):
+    user = User(email="a@example.com", hashed_password=hash_password("secret", rounds), is_verified=True)
+    db.add(user)
+    await db.commit()
+    return user.id
+
+
+async def _stored(db, user_id):
+    db.expire_all()
+    return (await db.execute(select(User.hashed_password, User.updated_at).where(User.id == user_id))).one()
+
+
+async def test_login_rehashes_stale_hash_without_touching_updated_at(client, db, monkeypatch):
+    user_id = await _create_user(db, rounds=4)
+    before = await _stored(db, user_id)
+    headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+    etag = (await client.get(f"{USERS}/me", headers=headers)).headers["ETag"]
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ROUNDS", 5)
+
+    r = await client.post("/auth/login", data={"username": "a@example.com", "password": "secret"})
+    assert r.status_code == 200
+
+    after = await _stored(db, user_id)
+    assert after.hashed_password.startswith("$2b$05$")
+    assert verify_password("secret", after.hashed_password)
+    assert after.updated_at == before.updated_at
+    # кешированный ETag совпадает с тем, что прочитается из БД
+    r = await client.get(f"{USERS}/me", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+
+async def test_current_hash_is_left_alone(client, db):
+    user_id = await _create_user(db, rounds=4)
+    before = await _stored(db, user_id)
+
+    r = await client.post("/auth/login", data={"username": "a@example.com", "password": "secret"})
+    assert r.status_code == 200
+
+    assert (await _stored(db, user_id)).hashed_password == before.hashed_password
@@ -0,0 +1,97 @@
+import pytest
+
+from app.core import db as app_db
+from app.core.db import Base, ReplicaSet, make_engine, make_sessionmaker
+from app.models.user import RoleEnum, User
+from app.services.auth import create_access_token
+
+USERS = "/users/users"
+
+
+@pytest.fixture
+async def replica(tmp_path, monkeypatch):
+    """
+    Отдельный файл SQLite в роли отстающей реплики: строки в нём пишет сам тест.
+    """
+    url = f"sqlite+aiosqlite:///{tmp_path}/replica.db"
+    engine = make_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    replicas = ReplicaSet([url])
+    monkeypatch.setattr(app_db, "_replicas", replicas)
+    async with make_sessionmaker(engine)() as session:
+        yield session
+    await replicas.dispose()
+    await engine.dispose()
+
+
+def _copy(user: User) -> User:
+    return User(
+        id=user.id,
+        email=user.email,
+        hashed_password=user.hashed_password,
+        first_name=user.first_name,
+        role=user.role,
+    )
+
+
+async def _create_user(db, email, role=RoleEnum.user, first_name="Old"):
+    user = User(email=email, hashed_password="x", first_name=first_name, role=role)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+async def test_unchanged_user_is_read_from_replica(client, db, replica):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    # строка есть только на реплике — значит, ответ пришёл оттуда
+    replica.add(User(id=99, email="replica@example.com", hashed_password="x"))
+    await replica.commit()
+
+    r = await client.get(f"{USERS}/99", headers=_auth(admin))
+
+    assert r.json()["email"] == "replica@example.com"
+
+
+async def test_new_user_missing_on_replica_is_read_from_primary(client, db, replica):
+    user = await _create_user(db, "new@example.com")
+
+    r = await client.get(f"{USERS}/me", headers=_auth(user))
+
+    assert r.status_code == 200
+    assert r.json()["email"] == "new@example.com"
+
+
+async def test_demoted_admin_is_not_recached_from_lagging_replica(client, db, replica):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    other = await _create_user(db, "other@example.com", role=RoleEnum.admin)
+    # реплика ещё не получила понижение other
+    replica.add_all([_copy(admin), _copy(other)])
+    await replica.commit()
+
+    r = await client.patch(f"{USERS}/{other.id}", json={"role": "user"}, headers=_auth(admin))
+    assert r.status_code == 200
+
+    r = await client.get(f"{USERS}/me", headers=_auth(other))
+    assert r.json()["role"] == "user"
+    r = await client.get(f"{USERS}/{admin.id}", headers=_auth(other))
+    assert r.status_code == 403
+
+
+async def test_changed_user_etag_is_not_served_from_lagging_replica(client, db, replica):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    user = await _create_user(db, "a@example.com")
+    replica.add_all([_copy(admin), _copy(user)])
+    await replica.commit()
+    r = await client.get(f"{USERS}/{user.id}", headers=_auth(admin))
+    old_etag = r.headers["ETag"]
+
+    await client.patch(f"{USERS}/{user.id}", json={"first_name": "New"}, headers=_auth(admin))
+
+    r = await client.get(f"{USERS}/{user.id}", headers={**_auth(admin), "If-None-Match": old_etag})
+    assert r.status_code == 200
+    assert r.json()["first_name"] == "New"
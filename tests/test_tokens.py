@@ -0,0 +1,50 @@
+from app.services.tokens import issue_tokens
+
+
+async def test_refresh_rotates_token(client):
+    tokens = await issue_tokens(1)
+
+    r = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert r.status_code == 200
+    assert r.json()["refresh_token"] != tokens["refresh_token"]
+
+
+async def test_refresh_token_cannot_be_reused(client):
+    tokens = await issue_tokens(1)
+    r = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    rotated = r.json()
+
+    r = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 401
+
+    # повтор старого токена не отзывает уже выданный новый
+    r = await client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert r.status_code == 200
+
+
+async def test_logout_revokes_refresh_token(client):
+    tokens = await issue_tokens(1)
+
+    r = await client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 204
+
+    r = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 401
+
+
+async def test_access_token_is_not_a_refresh_token(client):
+    tokens = await issue_tokens(1)
+
+    r = await client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]})
+
+    assert r.status_code == 401
+
+
+async def test_refresh_without_redis_is_unavailable(client, redis_server):
+    tokens = await issue_tokens(1)
+    redis_server.connected = False
+
+    r = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert r.status_code == 503
@@ -0,0 +1,88 @@
+from app.core.redis import get_redis
+from app.models.user import RoleEnum, User
+from app.services import user_cache
+from app.services.auth import create_access_token
+from app.services.user_cache import cache_user, get_cached_user, invalidate_user
+
+USERS = "/users/users"
+
+
+async def _create_user(db, email, role=RoleEnum.user):
+    user = User(email=email, hashed_password="x", first_name="Old", role=role)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+async def test_cached_user_is_read_from_redis_by_other_processes(db, redis_server):
+    user = await _create_user(db, "a@example.com")
+    await cache_user(user)
+    # другой процесс: своего кеша в памяти нет, есть только Redis
+    user_cache._local_cache = None
+
+    cached = await get_cached_user(user.id)
+
+    assert cached.email == "a@example.com"
+    assert cached.role == RoleEnum.user
+    assert await get_redis().exists(f"user:{user.id}")
+
+
+async def test_invalidation_clears_both_levels(db, redis_server):
+    user = await _create_user(db, "a@example.com")
+    await cache_user(user)
+
+    await invalidate_user(user.id)
+
+    assert await get_cached_user(user.id) is None
+
+
+async def test_cache_survives_redis_outage(db, redis_server):
+    user = await _create_user(db, "a@example.com")
+    redis_server.connected = False
+
+    await cache_user(user)
+
+    assert (await get_cached_user(user.id)).email == "a@example.com"
+
+
+async def test_patch_invalidates_cached_user(client, db):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    user = await _create_user(db, "a@example.com")
+    r = await client.get(f"{USERS}/{user.id}", headers=_auth(admin))
+    assert r.json()["first_name"] == "Old"
+
+    r = await client.patch(f"{USERS}/{user.id}", json={"first_name": "New"}, headers=_auth(admin))
+    assert r.status_code == 200
+
+    r = await client.get(f"{USERS}/{user.id}", headers=_auth(admin))
+    assert r.json()["first_name"] == "New"
+
+
+async def test_demoted_admin_loses_access_immediately(client, db):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    other = await _create_user(db, "other@example.com", role=RoleEnum.admin)
+    r = await client.get(f"{USERS}/me", headers=_auth(other))
+    assert r.json()["role"] == "admin"
+
+    r = await client.patch(f"{USERS}/{other.id}", json={"role": "user"}, headers=_auth(admin))
+    assert r.status_code == 200
+
+    r = await client.get(f"{USERS}/{admin.id}", headers=_auth(other))
+    assert r.status_code == 403
+
+
+async def test_deleted_user_cannot_authenticate(client, db):
+    admin = await _create_user(db, "admin@example.com", role=RoleEnum.admin)
+    user = await _create_user(db, "a@example.com")
+    r = await client.get(f"{USERS}/me", headers=_auth(user))
+    assert r.status_code == 200
+
+    r = await client.delete(f"{USERS}/{user.id}", headers=_auth(admin))
+    assert r.status_code == 204
+
+    r = await client.get(f"{USERS}/me", headers=_auth(user))
+    assert r.status_code in (401, 404)
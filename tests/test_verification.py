@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.core.config import settings
+
+from app.core.redis import get_redis
+from app.models.user import User
+from app.services.verification import hash_code, remember_code
+
+EMAIL = "new@example.com"
+CODE = "123456"
+
+
+async def _create_user(db, expires_in=timedelta(days=1)):
+    user = User(
+        email=EMAIL,
+        hashed_password="x",
+        verification_code=hash_code(EMAIL, CODE),
+        verification_expiry=datetime.now(timezone.utc) + expires_in,
+    )
+    db.add(user)
+    await db.commit()
+    return user.id
+
+
+async def _is_verified(db, user_id):
+    db.expire_all()
+    return await db.scalar(select(User.is_verified).where(User.id == user_id))
+
+
+async def test_wrong_code_is_rejected(client, db):
+    user_id = await _create_user(db)
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": "654321"})
+
+    assert r.status_code == 400
+    assert not await _is_verified(db, user_id)
+
+
+async def test_right_code_verifies_once(client, db):
+    user_id = await _create_user(db)
+    await remember_code(EMAIL, hash_code(EMAIL, CODE), 60)
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": CODE})
+    assert r.status_code == 200
+    assert await _is_verified(db, user_id)
+    assert await get_redis().get(f"verify:{EMAIL}") is None
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": CODE})
+    assert r.status_code == 400
+
+
+async def test_wrong_code_is_rejected_by_redis_cache(client, db):
+    user_id = await _create_user(db)
+    await remember_code(EMAIL, hash_code(EMAIL, CODE), 60)
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": "654321"})
+
+    assert r.status_code == 400
+    assert not await _is_verified(db, user_id)
+
+
+async def test_expired_code_is_rejected(client, db):
+    user_id = await _create_user(db, expires_in=timedelta(minutes=-1))
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": CODE})
+
+    assert r.status_code == 400
+    assert not await _is_verified(db, user_id)
+
+
+async def test_code_of_another_email_is_rejected(client, db):
+    await _create_user(db)
+
+    r = await client.post("/auth/verify", json={"email": "other@example.com", "code": CODE})
+
+    assert r.status_code == 400
+
+
+async def test_code_burns_after_too_many_wrong_attempts(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "VERIFICATION_MAX_ATTEMPTS", 3)
+    user_id = await _create_user(db)
+    await remember_code(EMAIL, hash_code(EMAIL, CODE), 60)
+
+    for wrong in ("000001", "000002", "000003"):
+        r = await client.post("/auth/verify", json={"email": EMAIL, "code": wrong})
+        assert r.status_code == 400
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": CODE})
+    assert r.status_code == 400
+    assert not await _is_verified(db, user_id)
+    db.expire_all()
+    assert await db.scalar(select(User.verification_code).where(User.id == user_id)) is None
+
+
+async def test_attempts_are_counted_without_cached_code(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "VERIFICATION_MAX_ATTEMPTS", 2)
+    user_id = await _create_user(db)
+
+    for wrong in ("000001", "000002"):
+        await client.post("/auth/verify", json={"email": EMAIL, "code": wrong})
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": CODE})
+    assert r.status_code == 400
+    assert not await _is_verified(db, user_id)
+
+
+async def test_right_code_after_a_few_wrong_attempts(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "VERIFICATION_MAX_ATTEMPTS", 3)
+    user_id = await _create_user(db)
+    await remember_code(EMAIL, hash_code(EMAIL, CODE), 60)
+
+    for wrong in ("000001", "000002"):
+        await client.post("/auth/verify", json={"email": EMAIL, "code": wrong})
+
+    r = await client.post("/auth/verify", json={"email": EMAIL, "code": CODE})
+    assert r.status_code == 200
+    assert await _is_verified(db, user_id)
+    assert await get_redis().get(f"verify:attempts:{EMAIL}") is None